@@ -0,0 +1,113 @@
+#! /usr/bin/env python3
+
+"""
+Demo of genetic programming with flat programs - same as
+demo_prog.py, but the organisms hold their program as a flat
+array of opcodes (FlatProgOrganism) rather than a tree of nodes
+
+This gp setup seeks to breed an organism which
+implements func x^2 + y
+"""
+
+import operator
+from random import uniform
+from pygene3.flatprog import FlatProgOrganism
+from pygene3.population import Population
+
+
+# float + and * can't fail, so these need no guarding
+def add(x, y):
+    return x + y
+
+def mul(x, y):
+    return x * y
+
+# define the class comprising the program organism
+class MyProg(FlatProgOrganism):
+    """
+    """
+    funcs = {
+        '+': add,
+        '*': mul,
+        }
+    # versions of the funcs working on whole columns of test
+    # cases, for calcVector
+    vecfuncs = {
+        '+': lambda x, y: map(operator.add, x, y),
+        '*': lambda x, y: map(operator.mul, x, y),
+        }
+    vars = ['x', 'y']
+    consts = [0.0, 1.0, 2.0, 10.0]
+
+    testVals = [{'x':uniform(-10.0, 10.0),
+                 'y':uniform(-10.0, 10.0),
+                 } for i in range(20)
+                ]
+
+    # the same test cases, as columns of values of each var
+    testCols = {'x': [vals['x'] for vals in testVals],
+                'y': [vals['y'] for vals in testVals],
+                }
+
+    def testFunc(self, **vars):
+        """
+        Just wanting to model x^2 + y
+        """
+        return vars['x'] ** 2 + vars['y']
+
+    def fitness(self):
+        badness = 0.0
+        try:
+            # evaluate the program on all test cases at once
+            results = self.calcVector(**self.testCols)
+            for result, vars in zip(results, self.testVals):
+                badness += (result - self.testFunc(**vars)) ** 2
+            return badness
+        except OverflowError:
+            return 1.0e+255 # infinitely bad
+
+    # maximum tree depth when generating randomly
+    initDepth = 6
+
+
+class ProgPop(Population):
+    "Population class for the experiment"
+    species = MyProg
+    initPopulation = 10
+
+    # cull to this many children after each generation
+    childCull = 20
+
+    # number of children to create after each generation
+    childCount = 20
+
+    mutants = 0.3
+
+
+def main():
+
+    pop = ProgPop()
+
+    ngens = 0
+    i = 0
+    while True:
+        b = pop.best()
+        print("Generation %s: %s best=%s average=%s nodes=%s)" % (
+            i, str(b), b.fitness(), pop.fitness(), b.calc_nodes()))
+        b.dump()
+
+        if b.fitness() <= 0:
+            print("cracked!")
+            break
+        i += 1
+        ngens += 1
+
+        if ngens < 100:
+            pop.gen()
+        else:
+            print("failed after 100 generations, restarting")
+            pop = ProgPop()
+            ngens = 0
+
+if __name__ == '__main__':
+    main()
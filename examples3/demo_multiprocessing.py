@@ -10,12 +10,11 @@ to the calculate_fitness() function, you'll notice the difference.
 
 """
 
-from multiprocessing import Pool
-
 from pygene3.gene import FloatGene, FloatGeneMax
 from pygene3.gamete import Gamete
 from pygene3.organism import Organism
 from pygene3.population import Population
+from pygene3.evaluator import ProcessEvaluator
 
 
 # Fitness function - global and unbound, for multiprocessing to be able to Pickle it
@@ -78,13 +77,9 @@ class StringHacker(Organism):
 
         return str(''.join(chars))
 
-    # submit fitness calculation to worker process
-    def prepare_fitness(self):
-    	self.result = pool.apply_async(calculate_fitness, [str(self), self.numgenes])
-
-    # block until result is ready, and retrieve it
+    # called within one of the worker processes
     def fitness(self):
-        return self.result.get()
+        return calculate_fitness(str(self), self.numgenes)
 
 class StringHackerPopulation(Population):
 
@@ -99,6 +94,9 @@ class StringHackerPopulation(Population):
     
     mutants = 0.25
 
+    # calculate fitness in a pool of 4 worker processes
+    evaluator = ProcessEvaluator(workers=4)
+
 # start with a population of 10 random organisms
 ph = StringHackerPopulation()
 
@@ -116,8 +114,6 @@ def main(nfittest=10, nkids=100):
 
 
 if __name__ == '__main__':
-	# create a pool of 4 worker processes (has to be declared below 'if __name....')
-	pool = Pool(processes=4)
-
-	# execute main loop
+	# execute main loop, worker processes are started on first use
+	# (which has to happen below 'if __name....')
 	main()
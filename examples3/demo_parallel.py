@@ -12,10 +12,9 @@ from pygene3.gene import PrintableCharGene
 from pygene3.gamete import Gamete
 from pygene3.organism import Organism, MendelOrganism
 from pygene3.population import Population
+from pygene3.evaluator import ThreadEvaluator
 
 from time import sleep
-import threading
-import queue
 
 # The same as in demo_string_char
 teststr = "hackthis"
@@ -34,48 +33,11 @@ for i in range(len(teststr)):
 
 
 ##
-# Worker thread / threads
+# Fitness is calculated by a pool of threads, see pygene3.evaluator
 ##
 
 threads_cnt = 15
 
-# Global task queue
-queue = queue.Queue()
-
-# Worker thread
-class Worker(threading.Thread):
-
-    def __init__(self, queue):
-        super(Worker, self).__init__()
-        self.queue = queue
-
-    def fitness(self, string):
-        diffs = 0
-        guess = string
-        # Simulate a lot of processing
-        sleep(0.01)
-        for i in range(len(teststr)):
-            x0 = ord(teststr[i])
-            x1 = ord(string[i])
-            diffs += (2 * (x1 - x0)) ** 2
-        return diffs
-
-    def run(self):
-        while True:
-            task = self.queue.get()
-            string, result_dict = task
-            fitness = self.fitness(string)
-            result_dict['fitness'] = fitness
-            self.queue.task_done()
-
-# Start threads
-threads = []
-for i in range(threads_cnt):
-    worker = Worker(queue)
-    worker.setDaemon(True)
-    worker.start()
-    threads.append(worker)
-
 
 class StringHacker(MendelOrganism):
     genome = genome
@@ -90,20 +52,19 @@ class StringHacker(MendelOrganism):
             chars.append(c)
         return ''.join(chars)
 
-    def prepare_fitness(self):
+    def fitness(self):
         """
-        Here we request fitness calculation.  Prepare place for result
-        and put our string into a queue.  A running worker-thread will
-        pick it up from the queue and calculate.
+        Called from within one of the evaluator threads
         """
-        self.result_dict = {}
-        queue.put((str(self), self.result_dict))
-
-    def fitness(self):
-        # Wait until all organisms in this population have it's fitness calculated
-        # Could wait only for it's fitness but it's more complicated...
-        queue.join()
-        return self.result_dict['fitness']
+        string = str(self)
+        diffs = 0
+        # Simulate a lot of processing
+        sleep(0.01)
+        for i in range(len(teststr)):
+            x0 = ord(teststr[i])
+            x1 = ord(string[i])
+            diffs += (2 * (x1 - x0)) ** 2
+        return diffs
 
 class StringHackerPopulation(Population):
 
@@ -116,6 +77,9 @@ class StringHackerPopulation(Population):
     # number of children to create after each generation
     childCount = 40
 
+    # calculate fitness of each generation in parallel
+    evaluator = ThreadEvaluator(workers=threads_cnt)
+
 # start with a population of 10 random organisms
 ph = StringHackerPopulation()
 
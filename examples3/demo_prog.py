@@ -11,8 +11,9 @@ to breed a matching program
 """
 
 import math
+import operator
 from random import random, uniform
-from pygene3.prog import ProgOrganism
+from pygene3.prog import ProgOrganism, vectorSafeDiv
 from pygene3.population import Population
 
 # a tiny batch of functions
@@ -104,7 +105,7 @@ class MyProg(ProgOrganism):
         '+': add,
 #        '-':sub,
         '*': mul,
-#        '/':div,
+        '/': div,
 #        '**': pow,
 #        'sqrt': sqrt,
 #        'log' : log,
@@ -112,6 +113,14 @@ class MyProg(ProgOrganism):
 #        'cos' : cos,
 #        'tan' : tan,
         }
+    # versions of the funcs working on whole columns of test
+    # cases, for calcVector - float + and * can't fail, so plain
+    # operators do; others guard each element instead of try/except
+    vecfuncs = {
+        '+': lambda x, y: map(operator.add, x, y),
+        '*': lambda x, y: map(operator.mul, x, y),
+        '/': vectorSafeDiv,
+        }
     vars = ['x', 'y']
     consts = [0.0, 1.0, 2.0, 10.0]
 
@@ -120,6 +129,11 @@ class MyProg(ProgOrganism):
                  } for i in range(20)
                 ]
 
+    # the same test cases, as columns of values of each var
+    testCols = {'x': [vals['x'] for vals in testVals],
+                'y': [vals['y'] for vals in testVals],
+                }
+
     mutProb = 0.4
 
     def testFunc(self, **vars):
@@ -132,8 +146,10 @@ class MyProg(ProgOrganism):
         # choose 10 random values
         badness = 0.0
         try:
-            for vars in self.testVals:
-                badness += (self.calc(**vars) - self.testFunc(**vars)) ** 2
+            # evaluate the program on all test cases at once
+            results = self.calcVector(**self.testCols)
+            for result, vars in zip(results, self.testVals):
+                badness += (result - self.testFunc(**vars)) ** 2
             return badness
         except OverflowError:
             return 1.0e+255 # infinitely bad
@@ -185,12 +185,14 @@ class TSPSolution(OrganismClass):
         organism's genotype
         """
         # create a sortable list of (priority, city) tuples
-        # (note that 'self[name]' extracts the city gene's phenotype,
-        # being the 'priority' of that city
-        sorter = [(self[name], cityDict[name]) for name in cityNames]
+        # (note that phenotype_vector() returns the city genes'
+        # phenotypes, being the 'priority' of each city, in the
+        # genome's order - which is the order of cityNames)
+        sorter = list(zip(self.phenotype_vector(), cities))
 
         # now sort them, the priority elem will determine order
-        sorter.sort()
+        # (cities can't be compared, should two priorities tie)
+        sorter.sort(key=lambda tup: tup[0])
         
         # now extract the city objects
         sortedCities = [tup[1] for tup in sorter]
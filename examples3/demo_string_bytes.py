@@ -0,0 +1,83 @@
+#! /usr/bin/env python3
+"""
+demo that cracks a secret string - same as demo_string.py,
+but the organisms hold their string in a single bytes object
+(ByteOrganism) rather than one gene per character.
+
+the feedback is how 'close' an organism's string
+is to the target string, based on the sum of the
+squares of the differences in the respective chars
+"""
+from pygene3.packed import ByteOrganism
+from pygene3.population import Population
+
+# this is the string that our organisms
+# are trying to evolve into
+teststr = b"hackthis"
+
+
+# an organism that evolves towards the required string
+
+class StringHacker(ByteOrganism):
+
+    length = len(teststr)
+    randMin = 'a'
+    randMax = 'z'
+    mutProb = 0.1
+    mutAmt = (ord('z') - ord('a')) / 2
+
+    def __repr__(self):
+        """
+        Return the string
+        """
+        return self.text()
+
+    def fitness(self):
+        """
+        calculate fitness, as the sum of the squares
+        of the distance of each char from the
+        corresponding char of the target string
+        """
+        diffs = 0
+        for x0, x1 in zip(teststr, self.buffer()):
+            diffs += (x1 - x0) ** 2
+        return diffs
+
+
+class StringHackerPopulation(Population):
+    # set population species
+    species = StringHacker
+
+    # Number of initial random organisms
+    initPopulation = 10
+
+    # cull to this many children after each generation
+    childCull = 10
+
+    # number of children to create after each generation
+    childCount = 100
+
+    mutants = 0.25
+
+
+def main():
+    from time import time
+
+    # start with a population of random organisms
+    world = StringHackerPopulation()
+
+    i = 0
+    started = time()
+    while True:
+        b = world.best()
+        print("generation %02d: %s best=%s average=%s)" % (
+            i, repr(b), b.get_fitness(), world.fitness()))
+        if b.get_fitness() <= 0:
+            print("cracked in ", i, "generations and ", time() - started, "seconds")
+            break
+        i += 1
+        world.gen()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,7 @@ to breed a matching program
 """
 
 import math
+import operator
 from random import random, uniform
 from pygene3.prog import ProgOrganism, typed
 from pygene3.population import Population
@@ -69,6 +70,14 @@ class MyTypedProg(ProgOrganism):
         '>': greater,
         #'<': lesser,
         }
+    # versions of the funcs working on whole columns of test
+    # cases, for calcVector
+    vecfuncs = {
+        '+': lambda x, y: map(operator.add, x, y),
+        '-': lambda x, y: map(operator.sub, x, y),
+        'iif': lambda x, y, z: [b if a else c for a, b, c in zip(x, y, z)],
+        '>': lambda x, y: map(operator.gt, x, y),
+        }
     vars = [('x', float), ('y', float)]
     consts = [0.0, 1.0, True]
     type = float
@@ -80,6 +89,12 @@ class MyTypedProg(ProgOrganism):
         } for i in range(20)
     ]
 
+    # the same test cases, as columns of values of each var
+    testCols = {
+        'x': [vals['x'] for vals in testVals],
+        'y': [vals['y'] for vals in testVals],
+    }
+
 
     mutProb = 0.4
 
@@ -96,8 +111,10 @@ class MyTypedProg(ProgOrganism):
         # choose 10 random values
         badness = 0.0
         try:
-            for vars in self.testVals:
-                badness += (self.calc(**vars) - self.testFunc(**vars)) ** 2
+            # evaluate the program on all test cases at once
+            results = self.calcVector(**self.testCols)
+            for result, vars in zip(results, self.testVals):
+                badness += (result - self.testFunc(**vars)) ** 2
 
             # Additionaly to correct solutions - promote short solutions.
             badness += self.calc_nodes() / 70.0
@@ -9,6 +9,7 @@ version = "0.3.2"
 
 __all__ = [
     'gene', 'gamete', 'organism', 'population', 'xmlio', 'prog',
-    'config'
+    'config', 'arraypop', 'evaluator', 'selection', 'island',
+    'checkpoint', 'schema', 'packed', 'flatprog'
     ]
 
@@ -0,0 +1,430 @@
+"""
+pygene/arraypop.py - Population which keeps the genes of its organisms
+as rows of gene values
+
+A regular Population holds organisms whose genotype is a dict of
+gene objects, and every generation allocates a fresh gene object
+for each gene of each child. ArrayPopulation instead stores the
+genotype of each organism as one plain row of gene values, with
+one column per gene name of the species' genome, and performs
+selection, crossover and mutation directly on those rows.
+
+This is plain Python over lists, not NumPy. What is batched is the
+random sampling: the genes which cross over, and those which mutate,
+are picked for a whole generation at once with sparseIndexes(), so
+the cost is one random draw per swapped or mutated gene rather than
+one per gene. Each picked value is still swapped or mutated one by
+one.
+
+Only haploid species (Organism subclasses using the standard
+uniform crossover) whose genes are FloatGene or IntGene subclasses
+are supported, since only their mutation rules are known here.
+
+Organisms of the population are light 'row organisms' - instances
+of a subclass of the species which read their values from the row.
+The species' fitness method works on them unchanged as long as it
+accesses genes via self[name]; self.genes is still available but
+builds gene objects on demand.
+"""
+
+from random import random, randrange, randint, uniform
+
+from .gene import (FloatGene, FloatGeneRandom, IntGene, IntGeneRandom,
+                   sparseIndexes)
+from .organism import Organism
+from .population import Population, fittest
+
+
+# mutation rules understood by ArrayPopulation, keyed by the
+# gene class method which defines the rule
+FLOAT = 'float'
+FLOAT_RANDOM = 'float_random'
+INT = 'int'
+INT_RANDOM = 'int_random'
+
+_mutationKinds = {
+    FloatGene.mutate: FLOAT,
+    FloatGeneRandom.mutate: FLOAT_RANDOM,
+    IntGene.mutate: INT,
+    IntGeneRandom.mutate: INT_RANDOM,
+}
+
+
+class GenomeLayout(object):
+    """
+    Column layout of a species' genome within the value rows
+
+    Holds, for each gene name in order, the gene class, its mutation
+    rule and its mutation parameters
+    """
+    def __init__(self, species):
+        if not issubclass(species, Organism):
+            raise Exception(
+                "ArrayPopulation needs an Organism species, got %s" % species)
+
+        if species.mate is not Organism.mate:
+            raise Exception(
+                "ArrayPopulation only supports Organism.mate crossover, "
+                "but %s overrides mate" % species.__name__)
+
+        schema = species.schema()
+
+        self.species = species
+        self.names = schema.names
+        self.index = schema.index
+        self.classes = schema.classes
+
+        self.kinds = []
+        for name, cls in zip(self.names, self.classes):
+            kind = _mutationKinds.get(getattr(cls, 'mutate', None))
+            if kind is None or not issubclass(cls, (FloatGene, IntGene)):
+                raise Exception(
+                    "ArrayPopulation cannot handle gene %s (%s): only "
+                    "FloatGene and IntGene mutation rules are supported" % (
+                        name, cls.__name__))
+            self.kinds.append(kind)
+
+        if schema.customMutation:
+            raise Exception(
+                "ArrayPopulation cannot handle gene %s: its class "
+                "overrides maybeMutated or maybeMutate" % (
+                    self.names[schema.customMutation[0]]))
+
+        self.mutProb = schema.mutProb
+        self.mutAmt = schema.mutAmt
+        self.randMin = schema.randMin
+        self.randMax = schema.randMax
+
+        self.numgenes = schema.numgenes
+
+    def randomRow(self):
+        """
+        Creates the values of a new random organism, honouring
+        fixed 'value' class attributes of the genes
+        """
+        row = []
+        for cls, kind, lo, hi in zip(
+                self.classes, self.kinds, self.randMin, self.randMax):
+            if cls.initValue is not None:
+                row.append(cls.initValue)
+            elif kind in (FLOAT, FLOAT_RANDOM):
+                row.append(uniform(lo, hi))
+            else:
+                row.append(randint(lo, hi))
+        return row
+
+    def rowFromOrganism(self, org):
+        """
+        Extracts the value row of a regular organism of the species
+        """
+        genes = org.genes
+        return [genes[name].value for name in self.names]
+
+    def crossover(self, parents1, parents2):
+        """
+        Uniform crossover of two lists of rows, pairwise
+
+        Matches Organism.mate - each gene goes to the first child
+        from the first parent with probability crossoverRate.
+        Returns a list of all the children rows, the two children
+        of each couple next to each other.
+
+        Children start as copies of their parents, and the genes
+        to swap between them are sampled for all the couples at
+        once - sampling whichever outcome is the rarer one.
+        """
+        rate = self.species.crossoverRate
+        n = self.numgenes
+        if rate >= 0.5:
+            firsts, seconds, prob = parents1, parents2, 1.0 - rate
+        else:
+            firsts, seconds, prob = parents2, parents1, rate
+        children1 = [list(row) for row in firsts]
+        children2 = [list(row) for row in seconds]
+
+        for p in sparseIndexes(n * len(children1), prob):
+            k, i = divmod(p, n)
+            child1 = children1[k]
+            child2 = children2[k]
+            child1[i], child2[i] = child2[i], child1[i]
+
+        children = []
+        for child1, child2 in zip(children1, children2):
+            children.append(child1)
+            children.append(child2)
+        return children
+
+    def mutateRows(self, rows):
+        """
+        Mutates a list of rows IN-PLACE, following the mutation
+        rules of each column's gene class
+
+        The mutating values of all the rows are picked at once,
+        then mutated one by one.
+        """
+        if self.species.mutateOneOnly:
+            for row in rows:
+                self.mutateValue(row, randrange(self.numgenes))
+        else:
+            # position p stands for gene p // len(rows) of
+            # row p % len(rows)
+            count = len(rows)
+            for p in self.species.schema().mutatingIndexes(count):
+                self.mutateValue(rows[p % count], p // count)
+        return rows
+
+    def mutateValue(self, row, i):
+        """
+        Mutates a single value of a row, as the gene's
+        mutate method would
+        """
+        kind = self.kinds[i]
+        value = row[i]
+        lo = self.randMin[i]
+        hi = self.randMax[i]
+
+        if kind == FLOAT:
+            if random() < 0.5:
+                value -= uniform(0, self.mutAmt[i] * (value - lo))
+            else:
+                value += uniform(0, self.mutAmt[i] * (hi - value))
+        elif kind == INT:
+            value += randint(-self.mutAmt[i], self.mutAmt[i])
+            if value < lo:
+                value = lo
+            elif value > hi:
+                value = hi
+        elif kind == FLOAT_RANDOM:
+            value = uniform(lo, hi)
+        else:
+            value = randint(lo, hi)
+
+        row[i] = value
+
+
+class RowOrganism(object):
+    """
+    Mixin for organisms whose genotype is a row of values
+    held by an ArrayPopulation
+
+    Use rowSpecies() to get the row organism class of a species.
+    """
+    # set by rowSpecies()
+    layout = None
+
+    def __init__(self, row=None, **kw):
+        """
+        Creates a row organism from a value row, or - same as
+        the species constructor - from gene keywords
+        """
+        if row is None:
+            row = self.layout.rowFromOrganism(self.layout.species(**kw))
+        self.row = row
+        self.fitness_cache = None
+
+    @classmethod
+    def fromRow(cls, row):
+        """
+        Wraps a value row, without copying or checking it
+        """
+        org = cls.__new__(cls)
+        org.row = row
+        org.fitness_cache = None
+        return org
+
+    @property
+    def genes(self):
+        """
+        Gene objects of this organism, built on demand
+
+        Changes to these genes are not reflected in the row
+        """
+        genes = {}
+        for name, cls, value in zip(
+                self.layout.names, self.layout.classes, self.row):
+            gene = cls.__new__(cls)
+            gene.value = value
+            genes[name] = gene
+        return genes
+
+    def __getitem__(self, item):
+        """
+        Returns the value of a gene of a given name
+        """
+        return self.row[self.layout.index[item]]
+
+    def genotype_key(self):
+        """
+        Returns the tuple of gene values, in genome order
+        """
+        return tuple(self.row)
+
+    @classmethod
+    def from_genotype_key(cls, key):
+        """
+        Creates an organism from a tuple of gene values
+        """
+        return cls.fromRow(list(key))
+
+    def __reduce__(self):
+        """
+        Pickles as the species and the row, as row organism
+        classes are created at runtime
+        """
+        return (_unpickleRow,
+                (self.layout.species, self.row, self.fitness_cache))
+
+    def copy(self):
+        """
+        returns a copy of this organism
+        """
+        return self.fromRow(list(self.row))
+
+    def mate(self, partner):
+        """
+        Uniform crossover with another row organism, see
+        Organism.mate
+        """
+        row1, row2 = self.layout.crossover([self.row], [partner.row])
+        return (self.fromRow(row1), self.fromRow(row2))
+
+    def mutate(self):
+        """
+        Returns a mutated copy of this organism
+        """
+        row = list(self.row)
+        self.layout.mutateRows([row])
+        return self.fromRow(row)
+
+
+_rowSpecies = {}
+
+def rowSpecies(species):
+    """
+    Returns the row organism class for a given species,
+    creating it on first use
+    """
+    try:
+        return _rowSpecies[species]
+    except KeyError:
+        pass
+
+    layout = GenomeLayout(species)
+    cls = type(species.__name__, (RowOrganism, species), {
+        'layout': layout,
+        'numgenes': layout.numgenes,
+        '__module__': species.__module__,
+        })
+    _rowSpecies[species] = cls
+    return cls
+
+
+def _unpickleRow(species, row, fitness):
+    """
+    Recreates a pickled row organism
+    """
+    org = rowSpecies(species).fromRow(row)
+    org.fitness_cache = fitness
+    return org
+
+
+class ArrayPopulation(Population):
+    """
+    Population which keeps genotypes as rows of gene values
+    and breeds them a generation at a time, see module docstring
+
+    Uses the same class variables as Population. The species
+    must be an Organism subclass with FloatGene/IntGene genes.
+    """
+    def __init__(self, *items, **kw):
+        """
+        Create a population with zero or more members
+
+        Arguments and keywords are as for Population
+        """
+        self.organisms = []
+
+        if 'species' in kw:
+            self.species = kw['species']
+
+        if 'init' in kw:
+            self.initPopulation = kw['init']
+
+        if 'evaluator' in kw:
+            self.evaluator = kw['evaluator']
+
+        self.resetFitnessCache()
+
+        self.rowSpecies = rowSpecies(self.species)
+        self.layout = self.rowSpecies.layout
+
+        if items:
+            self.add(*items)
+        else:
+            fromRow = self.rowSpecies.fromRow
+            self.organisms = [fromRow(self.layout.randomRow())
+                              for i in range(self.initPopulation)]
+        self.sorted = False
+
+    def add(self, *args):
+        """
+        Add organisms or populations to this population, converting
+        regular organisms of the species into row organisms
+        """
+        Population.add(self, *args)
+
+        rowcls = self.rowSpecies
+        for i, org in enumerate(self.organisms):
+            if not isinstance(org, rowcls):
+                row = self.layout.rowFromOrganism(org)
+                self.organisms[i] = rowcls.fromRow(row)
+                self.organisms[i].fitness_cache = org.fitness_cache
+
+    def addNewOrganisms(self):
+        """
+        Adds self.numNewOrganisms random organisms to the population
+        """
+        fromRow = self.rowSpecies.fromRow
+        for i in range(self.numNewOrganisms):
+            self.organisms.append(fromRow(self.layout.randomRow()))
+            self.sorted = False
+
+    def breed(self, nchildren):
+        """
+        Returns about 'nchildren' children of members of this sorted
+        population, plus the 'incest' best members themselves
+
+        Parent selection, crossover and mutation of the whole
+        generation are done on value rows.
+        """
+        layout = self.layout
+        fromRow = self.rowSpecies.fromRow
+        adults = self.organisms
+
+        # draw parents for all the couples, favouring fittest
+        ncouples = 1 if nchildren == 1 else nchildren // 2
+        pairs = self.selection.pairs(adults, ncouples)
+        parents1 = [adults[idx1].row for idx1, idx2 in pairs]
+        parents2 = [adults[idx2].row for idx1, idx2 in pairs]
+
+        rows = layout.crossover(parents1, parents2)
+        if self.mutateAfterMating:
+            layout.mutateRows(rows)
+
+        children = [fromRow(row) for row in rows]
+
+        # if incestuous, add in best adults
+        if self.incest:
+            children.extend(adults[:self.incest])
+
+        return children
+
+    def breedMutants(self, children):
+        """
+        Returns mutants of the self.mutants proportion of fittest
+        children, which must have their fitness calculated
+        """
+        numMutants = int(len(children) * self.mutants)
+        rows = self.layout.mutateRows(
+            [list(child.row) for child in fittest(children, numMutants)])
+        return [self.rowSpecies.fromRow(row) for row in rows]
@@ -0,0 +1,144 @@
+"""
+pygene/checkpoint.py - Compact binary snapshots of populations
+
+Used by Population.save() and Population.load(). A checkpoint holds:
+    - the population's parameters (childCull, childCount, incest, ...)
+    - the genotype of every member, as returned by genotype_key()
+    - every member's cached fitness
+    - the state of the 'random' module's generator, so an evolution
+      resumed from a checkpoint continues exactly as it would have
+
+Genotype keys which are tuples of numbers - as for Organism and
+MendelOrganism with int and float genes - are stored column by column,
+as packed arrays of doubles or 64-bit ints. Other values (eg. program
+trees of ProgOrganism) are pickled as they are.
+
+The file starts with MAGIC, followed by a pickle of the snapshot.
+The species is pickled by reference, so it must be importable when
+loading. Only load checkpoints you trust.
+"""
+
+import os
+import pickle
+import random
+from array import array
+
+# identifies checkpoint files, and their format version
+MAGIC = b'PGCK\x01'
+
+_intMin = -2 ** 63
+_intMax = 2 ** 63
+
+
+def pack(values):
+    """
+    Packs a list of values into a compact (kind, data) tuple
+
+    Kinds are:
+        - 'd' - data is the bytes of an array of doubles
+        - 'q' - data is the bytes of an array of 64-bit ints
+        - 't' - values are tuples of equal length, data is the list
+          of their packed columns
+        - 'o' - data is the list of values itself
+    """
+    if all(type(value) is float for value in values):
+        return ('d', array('d', values).tobytes())
+
+    if all(type(value) is int and _intMin <= value < _intMax
+           for value in values):
+        return ('q', array('q', values).tobytes())
+
+    if (all(type(value) is tuple for value in values)
+            and len(set(map(len, values))) == 1):
+        return ('t', [pack(list(column)) for column in zip(*values)])
+
+    return ('o', list(values))
+
+
+def unpack(packed, n):
+    """
+    Returns the list of 'n' values packed by pack()
+    """
+    kind, data = packed
+
+    if kind in ('d', 'q'):
+        values = array(kind)
+        values.frombytes(data)
+        return values.tolist()
+
+    if kind == 't':
+        if not data:
+            return [()] * n
+        return list(zip(*[unpack(column, n) for column in data]))
+
+    return data
+
+
+def dump(population, fileobj):
+    """
+    Writes a checkpoint of a population into an open binary file
+    """
+    organisms = population.organisms
+    snapshot = {
+        'species': population.species,
+        'params': dict((name, getattr(population, name))
+                       for name in population.checkpointParams),
+        'sorted': population.sorted,
+        'random': random.getstate(),
+        'count': len(organisms),
+        'genotypes': pack([org.genotype_key() for org in organisms]),
+        'fitness': pack([org.fitness_cache for org in organisms]),
+    }
+
+    fileobj.write(MAGIC)
+    pickle.dump(snapshot, fileobj, pickle.HIGHEST_PROTOCOL)
+
+
+def save(population, path):
+    """
+    Writes a checkpoint of a population to a file
+
+    The file is replaced atomically, so a crash while saving
+    leaves the previous checkpoint intact. 'path' may be a string
+    or a path object like pathlib.Path.
+    """
+    tmppath = os.fspath(path) + '.tmp'
+    with open(tmppath, 'wb') as fileobj:
+        dump(population, fileobj)
+    os.replace(tmppath, path)
+
+
+def load(cls, fileobj):
+    """
+    Reads a checkpoint from an open binary file, and returns
+    it as a population of class 'cls'
+
+    Restores the state of the 'random' module's generator.
+    """
+    if fileobj.read(len(MAGIC)) != MAGIC:
+        raise Exception("not a pygene checkpoint, or unsupported version")
+
+    snapshot = pickle.load(fileobj)
+
+    population = cls(species=snapshot['species'], init=0)
+    for name, value in snapshot['params'].items():
+        setattr(population, name, value)
+    population.resetFitnessCache()
+
+    count = snapshot['count']
+    keys = unpack(snapshot['genotypes'], count)
+    fitnesses = unpack(snapshot['fitness'], count)
+
+    species = population.species
+    organisms = []
+    for key, fitness in zip(keys, fitnesses):
+        organism = species.from_genotype_key(key)
+        organism.fitness_cache = fitness
+        organisms.append(organism)
+
+    if organisms:
+        population.add(*organisms)
+    population.sorted = snapshot['sorted']
+
+    random.setstate(snapshot['random'])
+    return population
@@ -143,6 +143,7 @@ class ConfigLoader(object):
         parse(self.config.getint, 'numNewOrganisms')
         parse(self.config.getboolean, 'mutateAfterMating')
         parse(self.config.getfloat, 'mutants')
+        parse(self.config.getint, 'fitnessCacheSize')
 
         return type(name, (Population,), args)
 
@@ -0,0 +1,227 @@
+"""
+pygene/evaluator.py - Backends calculating the fitness of organisms
+
+A Population hands every batch of organisms lacking a fitness value
+to its evaluator, which returns the fitness values in the same order.
+
+Available evaluators:
+    - SerialEvaluator - calls the species' fitness_batch in this
+      thread (the default)
+    - ThreadEvaluator - spreads chunks of the batch over a pool of
+      threads, good for fitness functions which wait for I/O or
+      release the GIL
+    - ProcessEvaluator - spreads chunks of the batch over a pool of
+      worker processes. Organisms and their species must be picklable,
+      ie. defined at the module level.
+
+Pools are started on first use and kept running between generations,
+until close() is called. Evaluators can be used as context managers.
+
+Populations evaluating asynchronously (Population.agen()) call
+aevaluate(), which awaits the species' afitness_batch for species
+with an 'async def fitness()', and otherwise evaluates as evaluate()
+does - pool evaluators without blocking the event loop.
+
+Example:
+
+    class MyPopulation(Population):
+        species = MyOrganism
+        evaluator = ProcessEvaluator(workers=8)
+
+FitnessCache is the memo of fitness values by genotype, used by
+populations with fitnessCacheSize set.
+"""
+
+import os
+import asyncio
+import inspect
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+def _evaluateChunk(species, organisms):
+    """
+    Calculates fitness of a chunk of organisms - runs within a worker
+    """
+    return species.fitness_batch(organisms)
+
+
+class SerialEvaluator(object):
+    """
+    Calculates fitness in the calling thread, with a single
+    call to the species' fitness_batch
+    """
+    def evaluate(self, species, organisms):
+        """
+        Returns a list of fitness values of the given organisms,
+        in order
+        """
+        return species.fitness_batch(organisms)
+
+    async def aevaluate(self, species, organisms, concurrency=10):
+        """
+        Returns a list of fitness values of the given organisms, in
+        order, awaiting at most 'concurrency' fitness calls at once
+        for species with an 'async def fitness()'
+        """
+        if inspect.iscoroutinefunction(species.fitness):
+            return await species.afitness_batch(organisms, concurrency)
+        return self.evaluate(species, organisms)
+
+    def close(self):
+        """
+        Releases resources held by this evaluator
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PoolEvaluator(SerialEvaluator):
+    """
+    Base class of evaluators submitting chunks of organisms to
+    a concurrent.futures executor
+
+    Arguments:
+        - workers - number of workers in the pool, default is
+          the number of CPUs
+        - chunkSize - number of organisms sent to a worker at once.
+          By default each worker gets about 4 chunks per batch.
+    """
+    # concurrent.futures.Executor subclass - override in subclasses
+    executorClass = None
+
+    def __init__(self, workers=None, chunkSize=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunkSize = chunkSize
+        self.executor = None
+
+    def evaluate(self, species, organisms):
+        """
+        Returns a list of fitness values of the given organisms,
+        in order, calculated by the pool workers
+        """
+        fitnesses = []
+        for future in self.submit(species, organisms):
+            fitnesses.extend(future.result())
+        return fitnesses
+
+    async def aevaluate(self, species, organisms, concurrency=10):
+        """
+        Returns a list of fitness values of the given organisms, in
+        order, awaiting the pool workers - or, for species with an
+        'async def fitness()', awaiting them in the event loop
+        """
+        if inspect.iscoroutinefunction(species.fitness):
+            return await species.afitness_batch(organisms, concurrency)
+
+        fitnesses = []
+        for chunk in await asyncio.gather(*[
+                asyncio.wrap_future(future)
+                for future in self.submit(species, organisms)]):
+            fitnesses.extend(chunk)
+        return fitnesses
+
+    def submit(self, species, organisms):
+        """
+        Submits chunks of organisms to the pool, returning the
+        list of futures of their lists of fitness values
+        """
+        if not organisms:
+            return []
+
+        if self.executor is None:
+            self.executor = self.executorClass(self.workers)
+
+        size = self.chunkSize
+        if not size:
+            size = -(-len(organisms) // (self.workers * 4))
+
+        return [
+            self.executor.submit(_evaluateChunk, species, organisms[i:i+size])
+            for i in range(0, len(organisms), size)
+        ]
+
+    def close(self):
+        """
+        Shuts the pool down, waiting for the workers to finish.
+        The pool is started again if the evaluator is used later.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+class ThreadEvaluator(PoolEvaluator):
+    """
+    Calculates fitness in a pool of threads
+    """
+    executorClass = ThreadPoolExecutor
+
+
+class ProcessEvaluator(PoolEvaluator):
+    """
+    Calculates fitness in a pool of worker processes
+    """
+    executorClass = ProcessPoolExecutor
+
+
+class FitnessCache(object):
+    """
+    Bounded memo of fitness values, keyed by organisms' genotype_key
+
+    When full, the least recently used genotype is forgotten.
+
+    Attributes:
+        - size - maximum number of genotypes held
+        - hits - number of lookups answered from the cache
+        - misses - number of lookups not found in the cache
+    """
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.fitnesses = OrderedDict()
+
+    def get(self, key):
+        """
+        Returns the fitness remembered for a genotype key,
+        or None if it isn't cached
+        """
+        try:
+            fitness = self.fitnesses[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.fitnesses.move_to_end(key)
+        self.hits += 1
+        return fitness
+
+    def put(self, key, fitness):
+        """
+        Remembers fitness of a genotype key
+        """
+        self.fitnesses[key] = fitness
+        self.fitnesses.move_to_end(key)
+        if len(self.fitnesses) > self.size:
+            self.fitnesses.popitem(last=False)
+
+    def clear(self):
+        """
+        Forgets all the genotypes and resets the counters
+        """
+        self.fitnesses.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.fitnesses)
+
+    def __repr__(self):
+        return "<FitnessCache:%d/%d hits=%d misses=%d>" % (
+            len(self), self.size, self.hits, self.misses)
@@ -0,0 +1,533 @@
+"""
+pygene/flatprog.py - Genetic programming organisms holding their
+program as a flat array of opcodes
+
+A FlatProgOrganism is declared like a ProgOrganism - with 'funcs',
+'vars' and 'consts' class attributes - but instead of a tree of node
+objects it holds its program in two arrays of ints:
+    - ops - the opcode of each node, in prefix order - a node is
+      followed by the nodes of its first argument, then those of its
+      second, and so on
+    - ends - for each node, the position just after its subtree,
+      so the subtree of the node at i is ops[i:ends[i]]
+
+Opcodes index the per-species tables built by the metaclass - funcs
+first, then vars, then consts - see FlatProgOrganismMetaclass.
+
+Crossover splices a slice of one parent's array into the other's,
+copying is an array copy and the number of nodes is the length of
+the array. The program is evaluated with a stack, or compiled like
+ProgOrganism's trees, and nothing recurses over the tree, so deep
+programs don't hit the recursion limit. Each node costs 8 bytes,
+rather than a Python object.
+
+Typed programs are checked once, when built from opcodes given to
+the constructor - mating and mutation only splice subtrees in place
+of subtrees of the same type, which keeps programs well-typed.
+
+Genotype keys are flat tuples of ('func', name), ('var', name) and
+('const', value) tokens, in prefix order.
+"""
+
+from array import array
+from random import randrange, choice
+
+from .organism import BaseOrganism
+from .prog import ProgOrganismMetaclass, Compiler, flipCoin, constKey
+
+
+def subtreeEnds(ops, arity):
+    """
+    Returns the array of subtree ends of a prefix array of opcodes,
+    given the list of arities of the opcodes
+    """
+    n = len(ops)
+    ends = array('i', range(1, n + 1))
+    stack = []
+    for i in range(n - 1, -1, -1):
+        k = arity[ops[i]]
+        if k:
+            # the children are on top of the stack, the last
+            # child deepest
+            if len(stack) < k:
+                raise Exception("malformed program - missing arguments")
+            ends[i] = stack[-k]
+            del stack[-k:]
+        stack.append(ends[i])
+    if len(stack) != 1:
+        raise Exception("malformed program - not a single tree")
+    return ends
+
+
+def splice(ops, ends, i, graft, graftEnds, j):
+    """
+    Returns the (ops, ends) arrays of a program with the subtree at
+    position i replaced by the subtree at position j of another
+    program, 'graft'
+    """
+    end = ends[i]
+    graftEnd = graftEnds[j]
+    delta = (graftEnd - j) - (end - i)
+
+    newOps = ops[:i] + graft[j:graftEnd] + ops[end:]
+
+    # nodes before i end either before it, or after its
+    # subtree - those are its ancestors, which grow by delta
+    newEnds = array('i', [e + delta if e >= end else e for e in ends[:i]])
+    newEnds.extend([e + i - j for e in graftEnds[j:graftEnd]])
+    newEnds.extend([e + delta for e in ends[end:]])
+    return newOps, newEnds
+
+
+class FlatProgOrganismMetaclass(ProgOrganismMetaclass):
+    """
+    Builds the opcode tables of a FlatProgOrganism subclass, on
+    top of the lists of functions and terminals
+
+    The tables are lists, indexed by opcode:
+        - opKeys - genotype key token of each opcode
+        - opNames - printable name
+        - opFuncs - the function, None for terminals
+        - opArity - number of arguments, 0 for terminals
+        - opVars - the variable name, None for funcs and consts
+        - opValues - the constant value, None for funcs and vars
+        - opTypes - result type, None for untyped programs
+        - opArgTypes - tuple of argument types, empty for untyped
+          programs
+
+    along with funcCodes, varCodes and constCodes, the lists of
+    opcodes of each kind, and opCodes, a dict mapping the tokens
+    of funcs and vars to their opcodes.
+    """
+    def __init__(cls, name, bases, data):
+        super(FlatProgOrganismMetaclass, cls).__init__(name, bases, data)
+
+        cls.opKeys = []
+        cls.opNames = []
+        cls.opFuncs = []
+        cls.opArity = []
+        cls.opVars = []
+        cls.opValues = []
+        cls.opTypes = []
+        cls.opArgTypes = []
+        cls.opCodes = {}
+        cls.funcCodes = []
+        cls.varCodes = []
+        cls.constCodes = []
+
+        for name, func, nargs, types in cls.funcsList:
+            if cls.type and types:
+                code = cls.addOp(('func', name), name, func=func,
+                                 arity=nargs, type_=types[0],
+                                 argtypes=tuple(types[1:]))
+            else:
+                code = cls.addOp(('func', name), name, func=func,
+                                 arity=nargs)
+            cls.opCodes[('func', name)] = code
+        for name in cls.vars:
+            code = cls.addOp(('var', name), '{%s}' % name, var=name,
+                             type_=cls.type and cls.funcsVars[name] or None)
+            cls.opCodes[('var', name)] = code
+        for value in cls.consts:
+            cls.constCode(value)
+
+    def addOp(cls, key, name, func=None, arity=0, var=None, value=None,
+              type_=None, argtypes=()):
+        """
+        Adds an opcode to the tables, returning it
+        """
+        code = len(cls.opKeys)
+        cls.opKeys.append(key)
+        cls.opNames.append(name)
+        cls.opFuncs.append(func)
+        cls.opArity.append(arity)
+        cls.opVars.append(var)
+        cls.opValues.append(value)
+        cls.opTypes.append(type_)
+        cls.opArgTypes.append(argtypes)
+
+        if func is not None:
+            cls.funcCodes.append(code)
+        elif var is not None:
+            cls.varCodes.append(code)
+        else:
+            cls.constCodes.append(code)
+        return code
+
+    def constCode(cls, value):
+        """
+        Returns the opcode of a constant value, adding it to the
+        tables if it's new - eg. a constant of a genotype key
+        """
+        lookup = constKey(value)
+        try:
+            return cls.opCodes[lookup]
+        except KeyError:
+            code = cls.opCodes[lookup] = cls.addOp(
+                ('const', value), '{%s}' % value, value=value,
+                type_=cls.type and type(value) or None)
+            return code
+
+
+class FlatProgOrganism(BaseOrganism, metaclass=FlatProgOrganismMetaclass):
+    """
+    Organism for genetic programming, holding its program as a
+    flat prefix array of opcodes - see module docstring
+
+    Add the same class attribs as for ProgOrganism - funcs, vars,
+    consts, and optionally vecfuncs, type and debugTypes - as well
+    as initDepth, the maximum depth of randomly generated trees.
+
+    The program of an organism is never changed in place - mating
+    and mutation make new arrays.
+    """
+
+    funcs = {}
+    vecfuncs = {}
+    vars = []
+    consts = []
+    type = None
+    debugTypes = False
+
+    def __init__(self, ops=None, ends=None):
+        """
+        Creates an organism from an array of opcodes, and
+        optionally its subtree ends, or randomly if not given
+        """
+        self.fitness_cache = None
+
+        if ops is None:
+            ops = array('i', self.genOps(type_=self.type))
+            ends = subtreeEnds(ops, self.opArity)
+        else:
+            if not isinstance(ops, array):
+                ops = array('i', ops)
+            if ends is None:
+                ends = subtreeEnds(ops, self.opArity)
+                if self.type:
+                    self.checkTypes(ops, ends)
+
+        self.ops = ops
+        self.ends = ends
+
+        # programs compiled on demand
+        self._compiled = None
+        self._compiledVector = None
+
+    def __getstate__(self):
+        """
+        Pickles without the compiled programs, which are
+        compiled again when needed
+        """
+        state = self.__dict__.copy()
+        state['_compiled'] = None
+        state['_compiledVector'] = None
+        return state
+
+    @classmethod
+    def genOps(cls, depth=1, type_=None):
+        """
+        Randomly generates the opcodes of a subtree rooted at
+        the given depth, as a list, in prefix order
+
+        The root of the program, at depth 1, is always a func.
+        """
+        ops = []
+        cls._genOps(ops, depth, type_)
+        return ops
+
+    @classmethod
+    def _genOps(cls, ops, depth, type_):
+        cnt = 0
+        while True:
+            cnt += 1
+            if depth > 1 and (depth >= cls.initDepth or flipCoin()):
+                # not root, and either maxed depth, or 50-50 chance
+                if flipCoin():
+                    options = cls.varCodes
+                else:
+                    options = cls.constCodes
+            else:
+                options = cls.funcCodes
+            if type_:
+                options = [code for code in options
+                           if cls.opTypes[code] == type_]
+            if options:
+                break
+            if cnt > 50:
+                print("Warning, probably an infinite loop")
+                print("  your options does not allow for tree construction")
+
+        code = choice(options)
+        ops.append(code)
+        argtypes = cls.opArgTypes[code]
+        for i in range(cls.opArity[code]):
+            cls._genOps(ops, depth + 1, argtypes and argtypes[i] or None)
+
+    @classmethod
+    def checkTypes(cls, ops, ends):
+        """
+        Raises TypeError unless the program is of the species'
+        type, and each func's arguments are of its argument types
+        """
+        types = cls.opTypes
+        if types[ops[0]] != cls.type:
+            raise TypeError("program of type %r instead of %r" % (
+                types[ops[0]], cls.type))
+
+        for i, code in enumerate(ops):
+            child = i + 1
+            for n, argtype in enumerate(cls.opArgTypes[code]):
+                if types[ops[child]] != argtype:
+                    raise TypeError(
+                        "argument %d of '%s' at %d is of type %r "
+                        "instead of %r" % (n + 1, cls.opNames[code], i,
+                                           types[ops[child]], argtype))
+                child = ends[child]
+
+    def copy(self):
+        """
+        returns a copy of this organism
+        """
+        return self.__class__(self.ops[:], self.ends[:])
+
+    def calc_nodes(self):
+        "Return number of nodes in the program"
+        return len(self.ops)
+
+    def depthOf(self, i):
+        """
+        Returns the depth of the node at position i, 1 for the root
+        """
+        # the ancestors of i are the nodes before it whose
+        # subtrees end after it
+        return 1 + sum([1 for end in self.ends[:i] if end > i])
+
+    def genotype_key(self):
+        """
+        Returns the program as a flat tuple of tokens
+        """
+        keys = self.opKeys
+        return tuple([keys[code] for code in self.ops])
+
+    @classmethod
+    def from_genotype_key(cls, key):
+        """
+        Creates an organism from a flat tuple of tokens
+        """
+        ops = []
+        for token in key:
+            if token[0] == 'const':
+                ops.append(cls.constCode(token[1]))
+            else:
+                ops.append(cls.opCodes[token])
+        return cls(ops)
+
+    def mate(self, partner):
+        """
+        Perform recombination - swaps a random subtree of this
+        organism with a random subtree of the partner, of the
+        same type
+        """
+        ops, ends = self.ops, self.ends
+        partnerOps, partnerEnds = partner.ops, partner.ends
+        types = self.opTypes
+
+        for tries in range(20):
+            # pick crossover points below the roots
+            if len(ops) < 2 or len(partnerOps) < 2:
+                break
+            i = randrange(1, len(ops))
+            if self.type:
+                t = types[ops[i]]
+                options = [j for j in range(1, len(partnerOps))
+                           if types[partnerOps[j]] == t]
+                if not options:
+                    continue
+                j = choice(options)
+            else:
+                j = randrange(1, len(partnerOps))
+
+            child1 = self.__class__(
+                *splice(ops, ends, i, partnerOps, partnerEnds, j))
+            child2 = self.__class__(
+                *splice(partnerOps, partnerEnds, j, ops, ends, i))
+            return (child1, child2)
+
+        print("Warning: Failed to swap trees for", tries + 1,
+              "times. Continuing...")
+        return self.copy(), partner.copy()
+
+    def mutate(self):
+        """
+        Returns a mutant, with a random argument of a random
+        func replaced by a new random subtree
+
+        A program made of a single terminal (eg. from a genotype
+        key) is replaced by a new random program.
+        """
+        ops, ends = self.ops, self.ends
+        arity = self.opArity
+
+        # pick a func, and one of its arguments
+        parents = [i for i, code in enumerate(ops) if arity[code]]
+        if not parents:
+            return self.__class__()
+        parent = choice(parents)
+        i = parent + 1
+        for n in range(randrange(arity[ops[parent]])):
+            i = ends[i]
+
+        subtree = array('i', self.genOps(self.depthOf(i),
+                                         self.opTypes[ops[i]]))
+        return self.__class__(*splice(
+            ops, ends, i, subtree, subtreeEnds(subtree, arity), 0))
+
+    def dump(self):
+        """
+        prints out this organism's program, as an indented tree
+        """
+        names = self.opNames
+        ends = self.ends
+        open_ = []
+        for i, code in enumerate(self.ops):
+            # close the subtrees ending here
+            while open_ and open_[-1] <= i:
+                open_.pop()
+            print("%s%s" % ("  " * (len(open_) + 1), names[code]))
+            open_.append(ends[i])
+
+    def source(self, compiler, vector=False):
+        """
+        Returns the program as a Python expression, for a Compiler
+
+        If vector is true, returns a (source, isVector) pair as
+        BaseNode.vectorSource() does.
+        """
+        funcs = self.opFuncs
+        arity = self.opArity
+        stack = []
+        for code in reversed(self.ops):
+            k = arity[code]
+            if k:
+                # arguments are on top of the stack, first on top
+                args = stack[:-k - 1:-1]
+                del stack[-k:]
+                if vector:
+                    expr = compiler.vectorCallSource(
+                        self.opNames[code], funcs[code], args)
+                else:
+                    expr = compiler.callSource(funcs[code], args)
+            elif self.opVars[code] is not None:
+                expr = compiler.params[self.opVars[code]]
+                if vector:
+                    expr = (expr, True)
+            else:
+                expr = compiler.constSource(self.opValues[code])
+                if vector:
+                    expr = (expr, False)
+            stack.append(expr)
+        return stack[0]
+
+    def interpret(self, vars):
+        """
+        Evaluates the program with a stack, plugging in a dict
+        of values of the vars
+
+        With debugTypes set, checks the type of each func's result.
+        """
+        funcs = self.opFuncs
+        arity = self.opArity
+        varnames = self.opVars
+        values = self.opValues
+        types = self.type and self.debugTypes and self.opTypes
+
+        stack = []
+        push = stack.append
+        for code in reversed(self.ops):
+            k = arity[code]
+            if k:
+                args = stack[:-k - 1:-1]
+                del stack[-k:]
+                t = funcs[code](*args)
+                if types and type(t) != types[code]:
+                    msg = (
+                        "\n"
+                        "Genetical programming type error:\n"
+                        "  Function '%s' returned %s (%r) instead of type %r\n"
+                    )
+                    print(msg % (self.opNames[code], t, type(t), types[code]))
+                    self.dump()
+                    print()
+                    raise TypeError
+                push(t)
+            elif varnames[code] is not None:
+                push(vars.get(varnames[code], 0.0))
+            else:
+                push(values[code])
+        return stack[0]
+
+    def calc(self, **vars):
+        """
+        Executes this program organism, using the given
+        keyword parameters
+        """
+        if self.debugTypes:
+            # interpret, checking types
+            return self.interpret(vars)
+
+        return self.compiled()(*[vars.get(name, 0.0) for name in self.vars])
+
+    def compiled(self):
+        """
+        Returns this program as a Python function, taking the
+        values of the variables as positional arguments, in the
+        order of 'vars' - see ProgOrganism.compiled()
+        """
+        program = self._compiled
+        if program is None:
+            try:
+                compiler = Compiler(self.vars)
+                program = compiler.function(self.source(compiler))
+            except (SyntaxError, RecursionError, MemoryError):
+                # too deep for the Python compiler - interpret
+                interpret = self.interpret
+                names = self.vars
+                def program(*args):
+                    return interpret(dict(zip(names, args)))
+            self._compiled = program
+        return program
+
+    def calcVector(self, **columns):
+        """
+        Executes this program organism on many fitness cases at
+        once, returning the list of results - see
+        ProgOrganism.calcVector()
+        """
+        n = len(next(iter(columns.values()))) if columns else 0
+
+        if self.debugTypes:
+            # interpret, checking types
+            names = list(columns)
+            interpret = self.interpret
+            return [interpret(dict(zip(names, case)))
+                    for case in zip(*columns.values())]
+
+        program = self._compiledVector
+        if program is None:
+            try:
+                compiler = Compiler(self.vars, self.vecfuncs)
+                program = compiler.vectorFunction(
+                    *self.source(compiler, vector=True))
+            except (SyntaxError, RecursionError, MemoryError):
+                # too deep for the Python compiler - interpret
+                interpret = self.interpret
+                names = self.vars
+                def program(n, *args):
+                    args = [[0.0] * n if arg is None else arg
+                            for arg in args]
+                    return [interpret(dict(zip(names, case)))
+                            for case in zip(*args)]
+            self._compiledVector = program
+
+        return program(n, *[columns.get(name) for name in self.vars])
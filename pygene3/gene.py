@@ -9,12 +9,59 @@ These genes work via classical Mendelian genetics
 """
 
 import sys
-from random import random, randint, uniform, choice
-from math import sqrt
+from random import random, randint, randrange, uniform, choice
+from math import sqrt, log, log1p
 
 from .xmlio import PGXmlMixin
 
-class BaseGene(PGXmlMixin):
+class GeneMetaclass(type):
+    """
+    Keeps gene instances compact
+
+    Every gene class gets empty __slots__ unless it defines its own,
+    so a gene instance holds just its 'value' slot, without a __dict__.
+    Parameters like mutProb stay shared class attributes.
+
+    A 'value' given in a gene class body (or to a gene factory) is the
+    initial value of new genes. It is kept as the 'initValue' class
+    attribute, since the name 'value' is taken by the slot, and is
+    still readable and writable as the class' 'value'.
+
+    Gene subclasses needing extra instance attributes must declare
+    them in __slots__ (or add '__dict__' to __slots__). A subclass
+    may also define 'value' as a property, stored in other slots.
+
+    Once a gene class is created, and again whenever one of the class
+    attributes listed in its 'preparedFields' is set, its
+    prepareClass() classmethod is called to precompute whatever the
+    class derives from those attributes.
+    """
+    def __new__(meta, name, bases, data):
+        data = dict(data)
+        if 'value' in data and not isinstance(data['value'], property):
+            data['initValue'] = data.pop('value')
+        data.setdefault('__slots__', ())
+        return super(GeneMetaclass, meta).__new__(meta, name, bases, data)
+
+    def __init__(cls, name, bases, data):
+        super(GeneMetaclass, cls).__init__(name, bases, data)
+        cls.prepareClass()
+
+    def __setattr__(cls, name, value):
+        super(GeneMetaclass, cls).__setattr__(name, value)
+        if name in cls.preparedFields:
+            cls.prepareClass()
+
+    @property
+    def value(cls):
+        return cls.initValue
+
+    @value.setter
+    def value(cls, value):
+        cls.initValue = value
+
+
+class BaseGene(PGXmlMixin, metaclass=GeneMetaclass):
     """
     Base class from which all the gene classes are derived.
 
@@ -23,31 +70,54 @@ class BaseGene(PGXmlMixin):
     """
     # each gene should have an object in
     # which its genotype should be stored
-    value = None
+    __slots__ = ('value',)
+
+    # initial value of new genes, random if None -
+    # set as 'value' in subclasses
+    initValue = None
 
     # probability of a mutation occurring
     mutProb = 0.01
 
+    # set in classes whose __add__ draws the phenotype at random,
+    # so that MendelOrganism doesn't cache the phenotype of their pairs
+    randomPhenotype = False
+
     # List of acceptable fields for the factory
     fields = ["value", "mutProb"]
 
+    # class attributes which prepareClass() derives data from
+    preparedFields = ()
+
+    @classmethod
+    def prepareClass(cls):
+        """
+        Precomputes class-level data derived from the class
+        attributes named in preparedFields
+
+        Called once the class is created, and again when
+        one of those attributes is set. Override as needed.
+        """
+        pass
+
     def __init__(self):
 
         # if value is not provided, it will be
         # randomly generated
-        if self.__class__.value == None:
+        if self.initValue == None:
             self.value = self.randomValue()
         else:
-            self.value = self.__class__.value
+            self.value = self.initValue
 
 
     def copy(self):
         """
         returns clone of this gene
         """
-        cls = self.__class__()
-        cls.value = self.value
-        return cls
+        cls = self.__class__
+        gene = cls.__new__(cls)
+        gene.value = self.value
+        return gene
 
 
     def __add__(self, other):
@@ -75,6 +145,32 @@ class BaseGene(PGXmlMixin):
         if random() < self.mutProb:
             self.mutate()
 
+    def mutated(self):
+        """
+        Returns a mutated copy of this gene, leaving
+        this gene unchanged
+        """
+        gene = self.copy()
+        gene.mutate()
+        return gene
+
+    def maybeMutated(self):
+        """
+        Returns a mutated copy of this gene, subject to mutProb,
+        or this very gene if no mutation occurs
+
+        Genes are shared between parents and children, so organisms
+        mutate through this method rather than maybeMutate. Subclasses
+        still overriding maybeMutate get it called on a copy.
+        """
+        if type(self).maybeMutate is not BaseGene.maybeMutate:
+            gene = self.copy()
+            gene.maybeMutate()
+            return gene
+        if random() < self.mutProb:
+            return self.mutated()
+        return self
+
     def mutate(self):
         """
         Perform a mutation on the gene
@@ -281,6 +377,8 @@ class FloatGeneRandom(FloatGene):
 
 
 class FloatGeneRandRange(FloatGene):
+    randomPhenotype = True
+
     def __add__(self, other):
         """
         A variation of float gene where during the mixing a random value
@@ -308,6 +406,8 @@ class FloatGeneExchange(FloatGene):
     phenotype of this gene is the random of the values
     in the gene pair
     """
+    randomPhenotype = True
+
     def __add__(self, other):
         """
         produces phenotype of gene pair, as the random of this
@@ -382,6 +482,8 @@ class IntGeneRandom(IntGene):
 
 
 class IntGeneExchange(IntGene):
+    randomPhenotype = True
+
     def __add__(self, other):
         """
         A variation of int gene where during the mixing a
@@ -400,6 +502,8 @@ class IntGeneAverage(IntGene):
 
 
 class IntGeneRandRange(IntGene):
+    randomPhenotype = True
+
     def __add__(self, other):
         """
         A variation of int gene where during the mixing a random value
@@ -465,6 +569,8 @@ class CharGene(BaseGene):
 
 
 class CharGeneExchange(CharGene):
+    randomPhenotype = True
+
     def __add__(self, other):
         """
         A variation of char gene where during the mixing a
@@ -522,7 +628,16 @@ class DiscreteGene(BaseGene):
 
     Mutation behaviour is that the gene's value may
     spontaneously change into one of its alleles
+
+    Genes hold the position of their allele in 'alleles', as
+    the small int 'code', and 'value' maps it to the allele.
+    Phenotypes of all the pairs of alleles are computed once per
+    class, into 'phenotypeTable' - the phenotype of a pair of genes
+    with codes c1 and c2 is phenotypeTable[c1 * numAlleles + c2].
+    Alleles must be hashable.
     """
+    __slots__ = ('code',)
+
     # this is the set of possible values
     # override in subclasses
     alleles = []
@@ -538,54 +653,116 @@ class DiscreteGene(BaseGene):
     # the recessive allele - leave as None if there's a dominant
     recessive = None
 
-    def mutate(self):
-        """
-        Change the gene's value into any of the possible alleles,
-        subject to mutation probability 'self.mutProb'
+    # Acceptable fields for factory
+    fields = ["value", "mutProb", "alleles", "dominant", "codominant",
+              "recessive"]
 
-        perform mutation IN-PLACE, ie don't return mutated copy
-        """
-        self.value = self.randomValue()
+    # the tables below are rebuilt when these are set
+    preparedFields = ("alleles", "dominant", "codominant", "recessive")
 
-    def randomValue(self):
+    @classmethod
+    def prepareClass(cls):
         """
-        returns a random allele
+        Builds the allele codes and the phenotype table
         """
-        return choice(self.alleles)
+        alleles = list(cls.alleles)
+        n = len(alleles)
+        cls.numAlleles = n
+        cls.alleleCodes = dict((allele, code)
+                               for code, allele in enumerate(alleles))
+        cls.phenotypeTable = [cls.combineAlleles(allele1, allele2)
+                              for allele1 in alleles
+                              for allele2 in alleles]
 
-    def __add__(self, other):
+    @classmethod
+    def combineAlleles(cls, allele1, allele2):
         """
-        determines the phenotype, subject to dominance properties
+        determines the phenotype of a pair of alleles,
+        subject to dominance properties
 
         returns a tuple of effects
         """
         # got simple dominance?
-        if self.dominant in (self.value, other.value):
+        if cls.dominant in (allele1, allele2):
             # yes
-            return (self.dominant,)
+            return (cls.dominant,)
 
         # got incomplete dominance?
-        elif self.codominant:
+        elif cls.codominant:
             phenotype = []
-            for val in self.value, other.value:
-                if val in self.codominant and val not in phenotype:
+            for val in allele1, allele2:
+                if val in cls.codominant and val not in phenotype:
                     phenotype.append(val)
 
             # apply recessive, if one exists and no codominant genes present
             if not phenotype:
-                if self.recessive:
-                    phenotype.append(self.recessive)
+                if cls.recessive:
+                    phenotype.append(cls.recessive)
 
             # done
             return tuple(phenotype)
 
         # got recessive?
-        elif self.recessive:
-            return (self.recessive,)
+        elif cls.recessive:
+            return (cls.recessive,)
 
         # nothing else
         return ()
 
+    def __init__(self):
+        if self.initValue is None:
+            self.code = randrange(self.numAlleles)
+        else:
+            self.value = self.initValue
+
+    @property
+    def value(self):
+        """
+        the allele of this gene
+        """
+        return self.alleles[self.code]
+
+    @value.setter
+    def value(self, value):
+        try:
+            self.code = self.alleleCodes[value]
+        except KeyError:
+            raise Exception("%r is not an allele of gene %s" % (
+                value, self.__class__.__name__))
+
+    def copy(self):
+        """
+        returns clone of this gene
+        """
+        cls = self.__class__
+        gene = cls.__new__(cls)
+        gene.code = self.code
+        return gene
+
+    def mutate(self):
+        """
+        Change the gene's value into any of the possible alleles,
+        subject to mutation probability 'self.mutProb'
+
+        perform mutation IN-PLACE, ie don't return mutated copy
+        """
+        self.code = randrange(self.numAlleles)
+
+    def randomValue(self):
+        """
+        returns a random allele
+        """
+        return choice(self.alleles)
+
+    def __add__(self, other):
+        """
+        determines the phenotype, subject to dominance properties,
+        by a lookup in the phenotype table
+
+        returns a tuple of effects
+        """
+        return self.phenotypeTable[self.code * self.numAlleles + other.code]
+
 class BitGene(BaseGene):
     """
     Implements a single-bit gene
@@ -693,3 +870,31 @@ def rndPair(geneclass):
     instances of the given gene class
     """
     return (geneclass(), geneclass())
+
+
+def sparseIndexes(n, prob):
+    """
+    Returns the ascending list of indexes in range(n), each
+    picked independently with probability prob
+
+    Jumps from one picked index to the next by geometrically
+    distributed skips, so it costs one random() call per picked
+    index rather than one per index in range(n).
+    """
+    if prob <= 0.0:
+        return []
+    if prob >= 1.0:
+        return list(range(n))
+
+    logq = log1p(-prob)
+    if logq == 0.0:
+        # prob too small to ever pick an index
+        return []
+    indexes = []
+    i = -1
+    while True:
+        # skips of tiny probabilities can exceed any int
+        i += 1 + int(min(log(1.0 - random()) / logq, n))
+        if i >= n:
+            return indexes
+        indexes.append(i)
@@ -0,0 +1,246 @@
+"""
+pygene/island.py - Island model: populations evolving in parallel
+worker processes, exchanging their best organisms now and then
+
+Each island is an instance of the same Population subclass, living in
+its own process with its own random number generator seed. Every
+'migrationInterval' generations, every island sends copies of its
+'migrants' fittest organisms to another island, chosen by the
+topology:
+    - 'ring' - island i sends to island i+1, the last one to the first
+    - 'random' - each island sends to a randomly chosen other island
+
+Arriving organisms join their new population and push out its least
+fit members, if they are fitter. Organisms travel between processes
+as (genotype_key, fitness) tuples, so the species must implement
+genotype_key and from_genotype_key, and both the population class and
+the species must be picklable, ie. defined at the module level.
+
+Example:
+
+    islands = IslandModel(MyPopulation, islands=8, migrants=2)
+    try:
+        best = islands.run(100)
+    finally:
+        islands.close()
+"""
+
+import os
+import random
+from multiprocessing import Process, Pipe
+
+from .population import fittest
+
+
+def _emigrants(pop, n):
+    """
+    Returns the n fittest organisms of a population as
+    (genotype key, fitness) tuples
+    """
+    pop.sort()
+    return [(org.genotype_key(), org.get_fitness())
+            for org in pop.organisms[:n]]
+
+
+def _immigrate(pop, migrants):
+    """
+    Adds migrants to a population, then culls it back to its
+    size, keeping the fittest
+    """
+    size = len(pop.organisms)
+    arrivals = []
+    for key, fitness in migrants:
+        org = pop.species.from_genotype_key(key)
+        org.fitness_cache = fitness
+        arrivals.append(org)
+
+    pop.add(*arrivals)
+    pop.evaluate(pop.organisms)
+    pop.organisms[:] = fittest(pop.organisms, size)
+    pop.sorted = True
+
+
+def _island(popclass, seed, migrants, conn):
+    """
+    Body of an island worker process - executes commands
+    received through conn
+    """
+    random.seed(seed)
+    pop = popclass()
+
+    while True:
+        command, arg = conn.recv()
+
+        if command == 'gen':
+            # evolve, and report the would-be emigrants
+            for i in range(arg):
+                pop.gen()
+            conn.send(_emigrants(pop, migrants))
+
+        elif command == 'migrate':
+            _immigrate(pop, arg)
+
+        elif command == 'best':
+            conn.send(_emigrants(pop, arg))
+
+        elif command == 'stop':
+            conn.close()
+            return
+
+
+class IslandModel(object):
+    """
+    Evolves a number of populations in worker processes,
+    with periodic migration between them
+
+    Arguments:
+        - population - Population subclass of the islands
+        - islands - number of islands, default is the number of CPUs
+        - migrationInterval - default 10 - generations between
+          migrations
+        - migrants - default 2 - number of fittest organisms each
+          island sends away in a migration
+        - topology - default 'ring' - 'ring' or 'random'
+        - seed - seed of island 0, island i uses seed + i. If not
+          given, islands are seeded randomly.
+    """
+    topologies = ('ring', 'random')
+
+    def __init__(self, population, islands=None, migrationInterval=10,
+                 migrants=2, topology='ring', seed=None):
+        if topology not in self.topologies:
+            raise ValueError("unknown topology %r" % topology)
+
+        self.population = population
+        self.species = population.species
+        self.numIslands = islands or os.cpu_count() or 1
+        self.migrationInterval = migrationInterval
+        self.migrants = migrants
+        self.topology = topology
+
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+
+        # generations executed so far
+        self.generation = 0
+
+        self.conns = []
+        self.processes = []
+
+    def start(self):
+        """
+        Starts the island processes, if not running yet
+        """
+        if self.processes:
+            return
+
+        for i in range(self.numIslands):
+            conn, child = Pipe()
+            process = Process(
+                target=_island,
+                args=(self.population, self.seed + i, self.migrants, child))
+            process.start()
+            child.close()
+            self.conns.append(conn)
+            self.processes.append(process)
+
+    def run(self, generations):
+        """
+        Executes a number of generations on all the islands,
+        migrating every migrationInterval generations
+
+        Returns the fittest organism of all the islands
+        """
+        self.start()
+
+        remaining = generations
+        while remaining > 0:
+            # evolve up to the next migration
+            done = self.generation % self.migrationInterval
+            step = min(self.migrationInterval - done, remaining)
+            for conn in self.conns:
+                conn.send(('gen', step))
+            emigrants = [conn.recv() for conn in self.conns]
+
+            self.generation += step
+            remaining -= step
+
+            if self.generation % self.migrationInterval == 0:
+                self.migrate(emigrants)
+
+        return self.best()
+
+    def destinations(self):
+        """
+        Returns the list of islands receiving migrants from
+        islands 0, 1, ...
+        """
+        n = self.numIslands
+        if self.topology == 'ring':
+            return [(i + 1) % n for i in range(n)]
+
+        # random - any island but itself
+        if n == 1:
+            return [0]
+        destinations = []
+        for i in range(n):
+            dest = random.randrange(n - 1)
+            destinations.append(dest if dest < i else dest + 1)
+        return destinations
+
+    def migrate(self, emigrants):
+        """
+        Sends the emigrants of each island to their destinations
+        """
+        if self.numIslands < 2:
+            return
+
+        arrivals = [[] for conn in self.conns]
+        for source, dest in enumerate(self.destinations()):
+            arrivals[dest].extend(emigrants[source])
+
+        for conn, migrants in zip(self.conns, arrivals):
+            if migrants:
+                conn.send(('migrate', migrants))
+
+    def best(self, n=1):
+        """
+        Returns the fittest organism of all islands, or a list
+        of the 'n' fittest ones if n is given and is not 1
+        """
+        self.start()
+
+        candidates = []
+        for conn in self.conns:
+            conn.send(('best', n))
+            candidates.extend(conn.recv())
+        candidates.sort(key=lambda candidate: candidate[1])
+
+        organisms = []
+        for key, fitness in candidates[:n]:
+            org = self.species.from_genotype_key(key)
+            org.fitness_cache = fitness
+            organisms.append(org)
+
+        if n == 1:
+            return organisms[0]
+        return organisms
+
+    def close(self):
+        """
+        Stops the island processes
+        """
+        for conn in self.conns:
+            conn.send(('stop', None))
+            conn.close()
+        for process in self.processes:
+            process.join()
+        self.conns = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
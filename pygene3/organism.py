@@ -16,13 +16,33 @@ Refer to module pygene.prog for organism classes for genetic
 programming.
 """
 
-from random import random, randrange, randint, choice
+import asyncio
+import inspect
+from random import random, randrange, randint, choice, getrandbits
 
 from .gene import BaseGene, rndPair
 from .gamete import Gamete
+from .schema import GenomeSchema
 
 from .xmlio import PGXmlMixin
 
+
+def checkFitness(fitness):
+    """
+    Returns a fitness value calculated synchronously, raising
+    TypeError if it's awaitable - ie. it comes from an
+    'async def fitness()', which must be awaited instead
+    """
+    if inspect.isawaitable(fitness):
+        if inspect.iscoroutine(fitness):
+            # don't warn about it never being awaited
+            fitness.close()
+        raise TypeError(
+            "fitness() returned an awaitable - calculate the fitness "
+            "of species with an 'async def fitness()' with "
+            "Population.agen(), asort() or aevaluate()")
+    return fitness
+
 class BaseOrganism(PGXmlMixin):
     """
     Base class for genetic algo and genetic programming
@@ -34,6 +54,9 @@ class BaseOrganism(PGXmlMixin):
         - MendelOrganism
         - ProgOrganism
     """
+    # GenomeSchema of the genome, see schema()
+    _schema = None
+
     def __add__(self, partner):
         """
         Allows '+' operator for sexual reproduction
@@ -82,6 +105,49 @@ class BaseOrganism(PGXmlMixin):
         """
         pass
 
+    @classmethod
+    def fitness_batch(cls, organisms):
+        """
+        Calculates the fitness of a whole list of organisms at once,
+        returning the fitness values in the same order.
+
+        Population calls this once per generation with all the
+        organisms which have no cached fitness yet. Override it in
+        species whose fitness is cheaper to calculate in bulk,
+        eg. by a vectorised calculation or one simulator call.
+
+        By default calls prepare_fitness on all the organisms, and
+        then 'fitness' on each of them.
+        """
+        for organism in organisms:
+            organism.prepare_fitness()
+        return [organism.fitness() for organism in organisms]
+
+    @classmethod
+    async def afitness_batch(cls, organisms, concurrency=10):
+        """
+        Asynchronous counterpart of fitness_batch, for species
+        with an 'async def fitness()'
+
+        By default calls prepare_fitness on all the organisms, and
+        then awaits 'fitness' of at most 'concurrency' of them at
+        once. Non-coroutine fitness methods are simply called.
+        """
+        for organism in organisms:
+            organism.prepare_fitness()
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def calculate(organism):
+            async with semaphore:
+                fitness = organism.fitness()
+                if inspect.isawaitable(fitness):
+                    fitness = await fitness
+                return fitness
+
+        return await asyncio.gather(
+            *[calculate(organism) for organism in organisms])
+
     def get_fitness(self):
         """
         Return fitness from the cache, and if needed - calculate it.
@@ -89,9 +155,46 @@ class BaseOrganism(PGXmlMixin):
         if self.fitness_cache is not None:
             return self.fitness_cache
         else:
-            self.fitness_cache = self.fitness()
+            self.fitness_cache = checkFitness(self.fitness())
             return self.fitness_cache
 
+    def genotype_key(self):
+        """
+        Returns a hashable value identifying this organism's
+        genotype - organisms with equal keys must have equal fitness.
+
+        Used by populations to look up the fitness of duplicate
+        organisms in their fitness cache.
+
+        Must be overridden to use a fitness cache
+        """
+        raise Exception("method 'genotype_key' not implemented")
+
+    @classmethod
+    def schema(cls):
+        """
+        Returns the GenomeSchema of this species' genome
+
+        The schema is computed on first use, and again if the
+        'genome' class attribute is replaced.
+        """
+        schema = cls._schema
+        if schema is None or schema.genome is not cls.genome:
+            schema = cls._schema = GenomeSchema(cls.genome)
+        return schema
+
+    @classmethod
+    def from_genotype_key(cls, key):
+        """
+        Creates an organism from a value returned by genotype_key
+
+        Allows organisms to be sent between processes, or stored,
+        in the compact form of their key.
+
+        Must be overridden
+        """
+        raise Exception("method 'from_genotype_key' not implemented")
+
     def duel(self, opponent):
         """
         Duels this organism against an opponent
@@ -236,11 +339,13 @@ class Organism(BaseOrganism):
         # Cache fitness
         self.fitness_cache = None
 
+        schema = self.schema()
+
         # remember the gene count
-        self.numgenes = len(self.genome)
+        self.numgenes = schema.numgenes
 
         # we're being fed a set of zero or more genes
-        for name, cls in list(self.genome.items()):
+        for name, cls in schema.items:
 
             # set genepair from given arg, or default to a
             # new random instance of the gene
@@ -249,7 +354,7 @@ class Organism(BaseOrganism):
             # if we're handed a gene class instead of a gene object
             # we need to instantiate the gene class
             # to form the needed gene object
-            if type(gene) == type and issubclass(gene, BaseGene):
+            if isinstance(gene, type) and issubclass(gene, BaseGene):
                 gene = gene()
             elif not isinstance(gene, BaseGene):
                 # If it wasn't a subclass check if it's an instance
@@ -260,14 +365,52 @@ class Organism(BaseOrganism):
             # all good - add in the gene to our genotype
             self.genes[name] = gene
 
+    @classmethod
+    def _fromGenes(cls, genes):
+        """
+        Creates an organism adopting a dict of genes as it is,
+        without checking it - for mate, copy and mutate, whose
+        genes come from valid organisms
+
+        The dict must hold a gene of each name in the genome.
+        Subclasses overriding __init__ get the checked construction,
+        so that their __init__ still runs.
+        """
+        if cls.__init__ is not Organism.__init__:
+            return cls(**genes)
+
+        org = cls.__new__(cls)
+        org.genes = genes
+        org.fitness_cache = None
+        org.numgenes = cls.schema().numgenes
+        return org
+
     def copy(self):
         """
         returns a deep copy of this organism
         """
         genes = {}
-        for name, gene in list(self.genes.items()):
+        for name, gene in self.genes.items():
             genes[name] = gene.copy()
-        return self.__class__(**genes)
+        return self._fromGenes(genes)
+
+    def genotype_key(self):
+        """
+        Returns the tuple of gene values, in genome order
+        """
+        genes = self.genes
+        return tuple([genes[name].value for name in self.schema().names])
+
+    @classmethod
+    def from_genotype_key(cls, key):
+        """
+        Creates an organism from a tuple of gene values
+        """
+        genes = {}
+        for (name, genecls), value in zip(cls.schema().items, key):
+            genes[name] = gene = genecls.__new__(genecls)
+            gene.value = value
+        return cls._fromGenes(genes)
 
     def mate(self, partner):
         """
@@ -279,7 +422,7 @@ class Organism(BaseOrganism):
         genotype2 = {}
 
         # gene by gene, we assign our and partner's genes randomly
-        for name, cls in list(self.genome.items()):
+        for name, cls in self.schema().items:
 
             ourGene = self.genes.get(name, None)
             if not ourGene:
@@ -298,8 +441,8 @@ class Organism(BaseOrganism):
                 genotype2[name] = ourGene
 
         # got the genotypes, now create the child organisms
-        child1 = self.__class__(**genotype1)
-        child2 = self.__class__(**genotype2)
+        child1 = self._fromGenes(genotype1)
+        child2 = self._fromGenes(genotype2)
 
         # done
         return (child1, child2)
@@ -311,6 +454,14 @@ class Organism(BaseOrganism):
         """
         return self.genes[item].value
 
+    def phenotype_vector(self):
+        """
+        Returns the list of the values of all the genes,
+        in genome order
+        """
+        genes = self.genes
+        return [genes[name].value for name in self.schema().names]
+
     def phenotype(self, geneName=None):
         """
         Returns the phenotype resulting from a
@@ -324,7 +475,7 @@ class Organism(BaseOrganism):
         # phenotype dict
         if geneName == None:
             phenotype = {}
-            for name, cls in list(self.genome.items()):
+            for name, cls in self.schema().items:
                 val = self.phenotype(name)
                 if name not in phenotype:
                     phenotype[name] = []
@@ -345,19 +496,29 @@ class Organism(BaseOrganism):
         Does not affect this organism, but returns a mutated
         copy of it
         """
-        mutant = self.copy()
+        # genes are shared with this organism, and only those
+        # which mutate get copied
+        genes = dict(self.genes)
+        schema = self.schema()
+        names = schema.names
 
         if self.mutateOneOnly:
             # unconditionally mutate just one gene
-            gene = choice(list(mutant.genes.values()))
-            gene.mutate()
+            name = choice(names)
+            genes[name] = genes[name].mutated()
 
         else:
-            # conditionally mutate all genes
-            for gene in list(mutant.genes.values()):
-                gene.maybeMutate()
+            # conditionally mutate all genes - pick the mutating
+            # ones at once, rather than rolling for each gene
+            for i in schema.mutatingIndexes():
+                name = names[i]
+                genes[name] = genes[name].mutated()
 
-        return mutant
+            for i in schema.customMutation:
+                name = names[i]
+                genes[name] = genes[name].maybeMutated()
+
+        return self._fromGenes(genes)
 
     def dump(self):
         """
@@ -435,7 +596,7 @@ class GenomeSplitOrganism(Organism):
         # G.G.G.G.G.G
 
         # Generate two random intersections
-        intersections = set(randrange(0, len(self.genome))
+        intersections = set(randrange(0, self.numgenes)
                             for i in range(self.chromosome_intersections))
 
         intersections = list(sorted(intersections))
@@ -443,7 +604,7 @@ class GenomeSplitOrganism(Organism):
         source_a = self.genes
         source_b = partner.genes
         # gene by gene, we assign our and partner's genes
-        for i, name in enumerate(sorted(self.genome.keys())):
+        for i, name in enumerate(self.schema().sortedNames):
             if i in intersections:
                 source_a, source_b = source_b, source_a
 
@@ -460,8 +621,8 @@ class GenomeSplitOrganism(Organism):
             genotype2[name] = gene_b
 
         # got the genotypes, now create the child organisms
-        child1 = self.__class__(**genotype1)
-        child2 = self.__class__(**genotype2)
+        child1 = self._fromGenes(genotype1)
+        child2 = self._fromGenes(genotype2)
 
         return (child1, child2)
 
@@ -527,16 +688,20 @@ class MendelOrganism(BaseOrganism):
         # Cache fitness
         self.fitness_cache = None
 
+        # Cache phenotypes of gene pairs, by gene name
+        self.phenotype_cache = {}
+
+        schema = self.schema()
+
         # remember the gene count
-        self.numgenes = len(self.genome)
+        self.numgenes = schema.numgenes
 
         if gamete1 and gamete2:
             # create this organism from sexual reproduction
-            for name, cls in list(self.genome.items()):
-                self.genes[name] = (
-                    gamete1[name].copy(),
-                    gamete2[name].copy(),
-                    )
+            # genes are never changed in place, so they
+            # can be shared with the parents
+            for name, cls in schema.items:
+                self.genes[name] = (gamete1[name], gamete2[name])
 
             # and apply mutation
             #self.mutate()
@@ -545,7 +710,7 @@ class MendelOrganism(BaseOrganism):
             return
 
         # other case - we're being fed a set of zero or more genes
-        for name, cls in list(self.genome.items()):
+        for name, cls in schema.items:
 
             # set genepair from given arg, or default to a
             # new random instance of the gene
@@ -555,7 +720,7 @@ class MendelOrganism(BaseOrganism):
             # of 2 genes, we need to instantiate the gene class
             # to form the needed tuple
 
-            if type(genepair) == type and issubclass(genepair, BaseGene):
+            if isinstance(genepair, type) and issubclass(genepair, BaseGene):
                 genepair = rndPair(genepair)
             else:
                 # we're given a tuple; validate the gene pair
@@ -576,14 +741,58 @@ class MendelOrganism(BaseOrganism):
             # all good - add in the gene pair to our genotype
             self.genes[name] = genepair
 
+    @classmethod
+    def _fromGenes(cls, genes):
+        """
+        Creates an organism adopting a dict of gene pairs as it is,
+        without checking it - for mate, copy and mutate, whose
+        genes come from valid organisms
+
+        The dict must hold a tuple of 2 genes for each name in the
+        genome. Subclasses overriding __init__ get the checked
+        construction, so that their __init__ still runs.
+        """
+        if cls.__init__ is not MendelOrganism.__init__:
+            return cls(**genes)
+
+        org = cls.__new__(cls)
+        org.genes = genes
+        org.fitness_cache = None
+        org.phenotype_cache = {}
+        org.numgenes = cls.schema().numgenes
+        return org
+
     def copy(self):
         """
         returns a deep copy of this organism
         """
         genes = {}
-        for name, genepair in list(self.genes.items()):
+        for name, genepair in self.genes.items():
             genes[name] = (genepair[0].copy(), genepair[1].copy())
-        return self.__class__(**genes)
+        return self._fromGenes(genes)
+
+    def genotype_key(self):
+        """
+        Returns the tuple of gene value pairs, in genome order
+        """
+        genes = self.genes
+        return tuple([(genes[name][0].value, genes[name][1].value)
+                      for name in self.schema().names])
+
+    @classmethod
+    def from_genotype_key(cls, key):
+        """
+        Creates an organism from a tuple of gene value pairs
+        """
+        genes = {}
+        for (name, genecls), values in zip(cls.schema().items, key):
+            pair = []
+            for value in values:
+                gene = genecls.__new__(genecls)
+                gene.value = value
+                pair.append(gene)
+            genes[name] = tuple(pair)
+        return cls._fromGenes(genes)
 
     def split(self):
         """
@@ -593,7 +802,7 @@ class MendelOrganism(BaseOrganism):
         genes1 = {}
         genes2 = {}
 
-        for name, cls in list(self.genome.items()):
+        for name, cls in self.schema().items:
 
             # fetch the pair of genes of that name
             genepair = self.genes[name]
@@ -617,12 +826,36 @@ class MendelOrganism(BaseOrganism):
         """
         Mates this organism with another organism to
         produce two entirely new organisms via mendelian crossover
+
+        Children get the genes they would get from the gametes of
+        split(), without building the gametes.
         """
-        #return self.split() + partner.split()
-        ourGametes = self.split()
-        partnerGametes = partner.split()
-        child1 = self.__class__(ourGametes[0], partnerGametes[1])
-        child2 = self.__class__(ourGametes[1], partnerGametes[0])
+        # one coin flip per gene pair of each parent, all drawn at
+        # once - flip '1' swaps the pair before it's split, so its
+        # second gene goes to the first child
+        names = self.schema().names
+        n = len(names)
+        flips = format(getrandbits(2 * n), '0%db' % (2 * n))
+
+        ourGenes = self.genes
+        partnerGenes = partner.genes
+        genes1 = {}
+        genes2 = {}
+
+        for name, ourFlip, partnerFlip in zip(names, flips, flips[n:]):
+            ours1, ours2 = ourGenes[name]
+            if ourFlip == '1':
+                ours1, ours2 = ours2, ours1
+
+            partner1, partner2 = partnerGenes[name]
+            if partnerFlip == '1':
+                partner1, partner2 = partner2, partner1
+
+            genes1[name] = (ours1, partner2)
+            genes2[name] = (ours2, partner1)
+
+        child1 = self._fromGenes(genes1)
+        child2 = self._fromGenes(genes2)
         return (child1, child2)
 
     def __getitem__(self, item):
@@ -630,7 +863,29 @@ class MendelOrganism(BaseOrganism):
         allows shorthand for querying the phenotype
         of this organism
         """
-        return self.phenotype(item)
+        if not isinstance(item, str):
+            item = str(item)
+        try:
+            return self.phenotype_cache[item]
+        except KeyError:
+            return self.phenotype(item)
+
+    @classmethod
+    def _phenotypeHooks(cls):
+        """
+        Returns a dict mapping gene names to this class'
+        'phen_<name>' methods, for the genes which have one
+        """
+        schema = cls.schema()
+        hooks = cls.__dict__.get('_phenHooks')
+        if hooks is None or hooks[0] is not schema:
+            methods = {}
+            for name in schema.names:
+                meth = getattr(cls, 'phen_' + name, None)
+                if meth is not None:
+                    methods[name] = meth
+            hooks = cls._phenHooks = (schema, methods)
+        return hooks[1]
 
     def phenotype(self, geneName=None):
         """
@@ -639,13 +894,19 @@ class MendelOrganism(BaseOrganism):
         from all the genes
 
         tries to invoke a child class' method
-        called 'phen_<name>'
+        called 'phen_<name>', with the pair of genes
+        as arguments, and otherwise adds up the pair
+
+        Phenotypes are calculated once, and cached - genes of
+        an organism must not be changed in place. Pairs of genes
+        whose class has randomPhenotype set (like FloatGeneExchange)
+        aren't cached, each call drawing a fresh phenotype.
         """
         # if no gene name specified, build up an entire
         # phenotype dict
         if geneName == None:
             phenotype = {}
-            for name, cls in list(self.genome.items()):
+            for name, cls in self.schema().items:
                 val = self.phenotype(name)
                 if name not in phenotype:
                     phenotype[name] = []
@@ -659,28 +920,41 @@ class MendelOrganism(BaseOrganism):
         if not isinstance(geneName, str):
             geneName = str(geneName)
 
+        cache = self.phenotype_cache
         try:
-            #return sum(self.genes[geneName])
-            genes = self.genes[geneName]
-            return genes[0] + genes[1]
-        except:
-            #print "self.genes[%s] = %s" % (geneName, self.genes[geneName])
-            raise
+            return cache[geneName]
+        except KeyError:
+            pass
 
-        # FIXME: There's an error here for sure. The code is unreachable
-        # Maybe it is supposed to be turned off.
+        value = self._calcPhenotype(geneName)
+        if geneName not in self.schema().randomPhenotypes:
+            cache[geneName] = value
+        return value
+
+    def phenotype_vector(self):
+        """
+        Returns the list of the phenotypes of all the
+        gene pairs, in genome order
+        """
+        cache = self.phenotype_cache
+        phenotype = self.phenotype
+        return [cache[name] if name in cache else phenotype(name)
+                for name in self.schema().names]
 
+    def _calcPhenotype(self, name):
+        """
+        Calculates the phenotype of the named gene pair
+        """
         # get the genes in question
-        gene1, gene2 = self.genes[geneName]
+        gene1, gene2 = self.genes[name]
 
         # try to find a specialised phenotype
         # calculation method
-        methname = 'phen_' + geneName
-        meth = getattr(self, methname, None)
+        meth = self._phenotypeHooks().get(name)
 
         if meth:
             # got the method - invoke it
-            return meth(gene1, gene2)
+            return meth(self, gene1, gene2)
         else:
             # no specialised methods, apply the genes'
             # combination methods
@@ -695,21 +969,35 @@ class MendelOrganism(BaseOrganism):
         Does not affect this organism, but returns a mutated
         copy of it
         """
-        mutant = self.copy()
+        # gene pairs are shared with this organism, and only
+        # the genes which mutate get copied
+        genes = dict(self.genes)
+
+        schema = self.schema()
+        names = schema.names
 
         if self.mutateOneOnly:
             # unconditionally mutate just one gene
-            genepair = choice(list(mutant.genes.values()))
-            genepair[0].mutate()
-            genepair[1].mutate()
+            name = choice(names)
+            gene_a, gene_b = genes[name]
+            genes[name] = (gene_a.mutated(), gene_b.mutated())
 
         else:
-            # conditionally mutate all genes
-            for gene_a, gene_b in list(mutant.genes.values()):
-                gene_a.maybeMutate()
-                gene_b.maybeMutate()
-
-        return mutant
+            # conditionally mutate all genes - pick the mutating
+            # ones at once, position 2*i + k standing for the k-th
+            # gene of pair i
+            for p in schema.mutatingIndexes(2):
+                name = names[p >> 1]
+                pair = list(genes[name])
+                pair[p & 1] = pair[p & 1].mutated()
+                genes[name] = tuple(pair)
+
+            for i in schema.customMutation:
+                name = names[i]
+                gene_a, gene_b = genes[name]
+                genes[name] = (gene_a.maybeMutated(), gene_b.maybeMutated())
+
+        return self._fromGenes(genes)
 
     def dump(self):
         """
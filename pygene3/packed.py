@@ -0,0 +1,454 @@
+"""
+pygene/packed.py - Organisms whose genome is packed into a few
+Python objects instead of one gene object per locus
+
+BitOrganism and MendelBitOrganism hold a string of 'numbits' bits in
+a single Python int - bit i of the int is locus i. This is the packed
+counterpart of a genome of BitGene genes: crossover picks bits with
+a random mask, mutation flips bits with a sparse random mask, and the
+AND/OR/XOR phenotype of a Mendelian pair is one bitwise operation on
+the two strands. Each operator costs a few operations on the
+whole int, rather than a Python object per bit.
+
+ByteOrganism holds a sequence of byte values in a single bytes
+object - the packed counterpart of a genome of CharGene genes, one
+per position. Crossover combines whole parent sequences through
+int operations, mutation only touches the bytes it changes, and
+fitness functions read the sequence in place through buffer().
+
+Example - feature selection over 10000 features:
+
+    class Selector(BitOrganism):
+        numbits = 10000
+        mutProb = 0.001
+
+        def fitness(self):
+            return error_of_model(self.indexes())
+"""
+
+from random import randrange, randint, getrandbits, choices
+from operator import and_, or_, xor
+
+from .gene import sparseIndexes
+from .organism import BaseOrganism
+
+
+# phenotype operators of MendelBitOrganism
+_combiners = {
+    'and': and_,
+    'or': or_,
+    'xor': xor,
+}
+
+
+def randomMask(numbits, prob=0.5):
+    """
+    Returns an int of 'numbits' random bits, each of them set
+    independently with probability prob
+    """
+    if prob == 0.5:
+        return getrandbits(numbits)
+    return indexMask(sparseIndexes(numbits, prob), numbits)
+
+
+def indexMask(indexes, numbits):
+    """
+    Returns an int of 'numbits' bits, with the bits at the
+    given indexes set
+    """
+    buf = bytearray((numbits + 7) // 8)
+    for i in indexes:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def byteMask(numbytes, prob=0.5):
+    """
+    Returns an int of 'numbytes' random bytes, each of them 0xff
+    with probability prob (rounded to a multiple of 1/256),
+    and 0 otherwise
+    """
+    threshold = int(round(prob * 256))
+    table = bytes(0xff if i < threshold else 0 for i in range(256))
+    data = getrandbits(8 * numbytes).to_bytes(numbytes, 'little')
+    return int.from_bytes(data.translate(table), 'little')
+
+
+def _byteValue(value):
+    """
+    Returns the byte value of a 1-char string, or an int as it is
+    """
+    if isinstance(value, str):
+        return ord(value)
+    return value
+
+
+def bitIndexes(bits):
+    """
+    Returns the ascending list of indexes of the bits set in an int
+    """
+    return [i for i, bit in enumerate(bin(bits)[:1:-1]) if bit == '1']
+
+
+class BitOrganism(BaseOrganism):
+    """
+    Haploid organism whose genome is a string of bits,
+    held in the 'bits' int
+
+    Class variables to override:
+        - numbits - length of the bit string
+        - mutProb - default 0.01 - probability of each bit
+          flipping in a mutation
+        - mutateOneOnly - default False - if set, a mutation
+          flips exactly one random bit instead
+        - crossoverRate - default .5 - proportion of bits the
+          first child of a mating takes from this organism
+
+    Python operators supported:
+        - + - mates two organism instances together
+        - [] - returns the bit (0 or 1) at a given index
+    """
+    numbits = 0
+    mutProb = 0.01
+    mutateOneOnly = False
+    crossoverRate = 0.5
+
+    def __init__(self, bits=None):
+        """
+        Creates an organism from an int of bits,
+        or with random bits if not given
+        """
+        if bits is None:
+            bits = getrandbits(self.numbits)
+        self.bits = bits
+        self.fitness_cache = None
+
+    def __getitem__(self, item):
+        """
+        Returns the bit at a given index
+        """
+        return (self.bits >> item) & 1
+
+    def indexes(self):
+        """
+        Returns the ascending list of indexes of the set bits
+        """
+        return bitIndexes(self.bits)
+
+    def count(self):
+        """
+        Returns the number of set bits
+        """
+        return bin(self.bits).count('1')
+
+    def copy(self):
+        """
+        returns a copy of this organism
+        """
+        return self.__class__(self.bits)
+
+    def genotype_key(self):
+        """
+        Returns the int of bits
+        """
+        return self.bits
+
+    @classmethod
+    def from_genotype_key(cls, key):
+        """
+        Creates an organism from an int of bits
+        """
+        return cls(key)
+
+    def mate(self, partner):
+        """
+        Uniform crossover - each bit of the first child comes from
+        this organism with probability crossoverRate, and from the
+        partner otherwise. The second child gets the other bits.
+        """
+        mask = randomMask(self.numbits, self.crossoverRate)
+        diff = (self.bits ^ partner.bits) & mask
+        child1 = self.__class__(partner.bits ^ diff)
+        child2 = self.__class__(self.bits ^ diff)
+        return (child1, child2)
+
+    def mutate(self):
+        """
+        Returns a mutated copy of this organism
+        """
+        if not self.numbits:
+            return self.__class__(self.bits)
+        if self.mutateOneOnly:
+            mask = 1 << randrange(self.numbits)
+        else:
+            mask = randomMask(self.numbits, self.mutProb)
+        return self.__class__(self.bits ^ mask)
+
+    def dump(self):
+        """
+        Produce a detailed human-readable report on
+        this organism
+        """
+        print("Organism %s:" % self.__class__.__name__)
+        print("  Fitness: %s" % self.get_fitness())
+        print("  Bits: %s" % format(self.bits, '0%db' % self.numbits))
+
+
+class MendelBitOrganism(BaseOrganism):
+    """
+    Diploid organism whose genome is a pair of bit strings,
+    held in the 'bits1' and 'bits2' ints
+
+    Class variables to override:
+        - numbits - length of each bit string
+        - dominance - default 'xor' - how the bits of the pair
+          combine into the phenotype - 'and', 'or' or 'xor', as
+          for AndBitGene, OrBitGene and XorBitGene respectively
+        - mutProb - default 0.01 - probability of each bit
+          flipping in a mutation
+        - mutateOneOnly - default False - if set, a mutation
+          flips exactly one random bit pair instead
+
+    Python operators supported:
+        - + - mates two organism instances together
+        - [] - returns the phenotype bit at a given index
+    """
+    numbits = 0
+    dominance = 'xor'
+    mutProb = 0.01
+    mutateOneOnly = False
+
+    def __init__(self, bits1=None, bits2=None):
+        """
+        Creates an organism from a pair of ints of bits,
+        or with random bits if not given
+        """
+        if bits1 is None:
+            bits1 = getrandbits(self.numbits)
+        if bits2 is None:
+            bits2 = getrandbits(self.numbits)
+        self.bits1 = bits1
+        self.bits2 = bits2
+        self.fitness_cache = None
+
+    def phenotype(self):
+        """
+        Returns the int of phenotype bits
+        """
+        return _combiners[self.dominance](self.bits1, self.bits2)
+
+    def __getitem__(self, item):
+        """
+        Returns the phenotype bit at a given index
+        """
+        return (self.phenotype() >> item) & 1
+
+    def indexes(self):
+        """
+        Returns the ascending list of indexes of the set
+        phenotype bits
+        """
+        return bitIndexes(self.phenotype())
+
+    def copy(self):
+        """
+        returns a copy of this organism
+        """
+        return self.__class__(self.bits1, self.bits2)
+
+    def genotype_key(self):
+        """
+        Returns the pair of ints of bits
+        """
+        return (self.bits1, self.bits2)
+
+    @classmethod
+    def from_genotype_key(cls, key):
+        """
+        Creates an organism from a pair of ints of bits
+        """
+        return cls(*key)
+
+    def split(self):
+        """
+        Returns the two complementary gametes of a random
+        split of this organism's bit pairs, as ints
+        """
+        diff = (self.bits1 ^ self.bits2) & getrandbits(self.numbits)
+        return (self.bits1 ^ diff, self.bits2 ^ diff)
+
+    def mate(self, partner):
+        """
+        Mendelian crossover - each child gets one bit of each pair
+        from this organism and one from the partner
+        """
+        ours = self.split()
+        theirs = partner.split()
+        child1 = self.__class__(ours[0], theirs[1])
+        child2 = self.__class__(ours[1], theirs[0])
+        return (child1, child2)
+
+    def mutate(self):
+        """
+        Returns a mutated copy of this organism
+        """
+        if not self.numbits:
+            return self.__class__(self.bits1, self.bits2)
+        if self.mutateOneOnly:
+            mask = 1 << randrange(self.numbits)
+            return self.__class__(self.bits1 ^ mask, self.bits2 ^ mask)
+
+        return self.__class__(
+            self.bits1 ^ randomMask(self.numbits, self.mutProb),
+            self.bits2 ^ randomMask(self.numbits, self.mutProb))
+
+    def dump(self):
+        """
+        Produce a detailed human-readable report on
+        this organism
+        """
+        fmt = '0%db' % self.numbits
+        print("Organism %s:" % self.__class__.__name__)
+        print("  Fitness: %s" % self.get_fitness())
+        print("  Bits 1: %s" % format(self.bits1, fmt))
+        print("  Bits 2: %s" % format(self.bits2, fmt))
+        print("  Phenotype: %s" % format(self.phenotype(), fmt))
+
+
+class ByteOrganism(BaseOrganism):
+    """
+    Haploid organism whose genome is a sequence of byte values,
+    held in the 'data' bytes object
+
+    Class variables to override:
+        - length - number of bytes in the sequence
+        - randMin, randMax - default 0 and 255 - range of the byte
+          values, as ints or 1-char strings like CharGene's
+        - mutProb - default 0.01 - probability of each byte
+          mutating in a mutation
+        - mutAmt - default 10 - a mutating byte changes by up
+          to +/- this amount, and is reined back into range
+        - mutateOneOnly - default False - if set, a mutation
+          changes exactly one random byte instead
+        - crossoverRate - default .5 - proportion of bytes the
+          first child of a mating takes from this organism
+
+    Python operators supported:
+        - + - mates two organism instances together
+        - [] - returns the byte value at a given index
+    """
+    length = 0
+    randMin = 0
+    randMax = 255
+    mutProb = 0.01
+    mutAmt = 10
+    mutateOneOnly = False
+    crossoverRate = 0.5
+
+    def __init__(self, data=None):
+        """
+        Creates an organism from a bytes object, or a str
+        of chars within 0-255, or random if not given
+        """
+        if data is None:
+            values = range(_byteValue(self.randMin),
+                           _byteValue(self.randMax) + 1)
+            data = bytes(choices(values, k=self.length))
+        elif isinstance(data, str):
+            data = data.encode('latin-1')
+        self.data = bytes(data)
+        self.fitness_cache = None
+
+    def __getitem__(self, item):
+        """
+        Returns the byte value at a given index
+        """
+        return self.data[item]
+
+    def __len__(self):
+        return len(self.data)
+
+    def buffer(self):
+        """
+        Returns a read-only memoryview of the sequence,
+        without copying it
+        """
+        return memoryview(self.data)
+
+    def text(self):
+        """
+        Returns the sequence as a str, one char per byte
+        """
+        return self.data.decode('latin-1')
+
+    def copy(self):
+        """
+        returns a copy of this organism
+        """
+        return self.__class__(self.data)
+
+    def genotype_key(self):
+        """
+        Returns the bytes of the sequence
+        """
+        return self.data
+
+    @classmethod
+    def from_genotype_key(cls, key):
+        """
+        Creates an organism from the bytes of a sequence
+        """
+        return cls(key)
+
+    def mate(self, partner):
+        """
+        Uniform crossover - each byte of the first child comes from
+        this organism with probability crossoverRate, and from the
+        partner otherwise. The second child gets the other bytes.
+        """
+        n = len(self.data)
+        ours = int.from_bytes(self.data, 'little')
+        theirs = int.from_bytes(partner.data, 'little')
+        diff = (ours ^ theirs) & byteMask(n, self.crossoverRate)
+        child1 = self.__class__((theirs ^ diff).to_bytes(n, 'little'))
+        child2 = self.__class__((ours ^ diff).to_bytes(n, 'little'))
+        return (child1, child2)
+
+    def mutate(self):
+        """
+        Returns a mutated copy of this organism
+        """
+        if not self.data:
+            return self.__class__(self.data)
+        if self.mutateOneOnly:
+            indexes = [randrange(len(self.data))]
+        else:
+            indexes = sparseIndexes(len(self.data), self.mutProb)
+        if not indexes:
+            return self.__class__(self.data)
+
+        lo = _byteValue(self.randMin)
+        hi = _byteValue(self.randMax)
+        amt = int(self.mutAmt)
+        data = bytearray(self.data)
+        for i in indexes:
+            value = data[i] + randint(-amt, amt)
+
+            # if the byte has wandered outside the range,
+            # rein it back in
+            if value < lo:
+                value = lo
+            elif value > hi:
+                value = hi
+            data[i] = value
+
+        return self.__class__(data)
+
+    def dump(self):
+        """
+        Produce a detailed human-readable report on
+        this organism
+        """
+        print("Organism %s:" % self.__class__.__name__)
+        print("  Fitness: %s" % self.get_fitness())
+        print("  Data: %r" % self.data)
@@ -3,13 +3,39 @@ pygene/population.py - Represents a population of organisms
 """
 
 import random
-from random import randrange, choice
-from math import sqrt
+import inspect
+from heapq import nsmallest
+from bisect import bisect_right
+from operator import attrgetter
 
-from .organism import Organism, BaseOrganism
+from .organism import Organism, BaseOrganism, checkFitness
+from .evaluator import SerialEvaluator, FitnessCache
+from .selection import SqrtSelection
+from . import checkpoint
 
 from .xmlio import PGXmlMixin
 
+
+fitnessOf = attrgetter('fitness_cache')
+
+def fittest(organisms, n):
+    """
+    Returns the 'n' fittest of the given organisms, fittest first,
+    with ties kept in their original order
+
+    The organisms must have their fitness calculated already.
+    Fitness values are read once into a flat list, and only the
+    'n' best are picked out of it with a heap, without comparing
+    organism objects or sorting all of them.
+    """
+    if n >= len(organisms):
+        return sorted(organisms, key=fitnessOf)
+
+    fitnesses = [org.fitness_cache for org in organisms]
+    best = nsmallest(n, range(len(fitnesses)), key=fitnesses.__getitem__)
+    return [organisms[i] for i in best]
+
+
 class Population(PGXmlMixin):
     """
     Represents a population of organisms
@@ -41,6 +67,24 @@ class Population(PGXmlMixin):
           children to add to the child population; children to mutate
           are selected based on fitness
 
+        - evaluator - default SerialEvaluator - object calculating
+          the fitness of organisms, see pygene.evaluator
+
+        - fitnessCacheSize - default 0 - if set, remember fitness of
+          up to this many most recently seen genotypes, so organisms
+          equal to an already evaluated one are not evaluated again.
+          Requires species implementing genotype_key. Hit and miss
+          counts are kept in self.fitnessCache
+
+        - selection - default SqrtSelection - strategy picking parents,
+          favouring the fittest, see pygene.selection
+
+        - stepChildren - default 2 - number of children bred by
+          each step() of steady-state evolution
+
+        - asyncConcurrency - default 10 - maximum number of fitness
+          calculations awaited at once by agen() and asort()
+
     Supports the following python operators:
 
         - + - produces a new population instances, whose members are
@@ -74,6 +118,28 @@ class Population(PGXmlMixin):
     # set this to true to mutate all progeny
     mutateAfterMating = True
 
+    # calculates fitness of new organisms
+    evaluator = SerialEvaluator()
+
+    # number of genotypes to remember fitness of, 0 disables
+    fitnessCacheSize = 0
+
+    # picks parents of the next generation
+    selection = SqrtSelection()
+
+    # number of children to create in each steady-state step
+    stepChildren = 2
+
+    # number of 'async def fitness()' calls in flight at once
+    asyncConcurrency = 10
+
+    # parameters stored in checkpoints by save()
+    checkpointParams = [
+        'initPopulation', 'childCull', 'childCount', 'incest',
+        'numNewOrganisms', 'mutants', 'mutateAfterMating',
+        'fitnessCacheSize', 'stepChildren', 'asyncConcurrency',
+        ]
+
     def __init__(self, *items, **kw):
         """
         Create a population with zero or more members
@@ -91,9 +157,16 @@ class Population(PGXmlMixin):
               if not given, value comes from self.initPopulation
             - species - species of organism to create and add. If not
               given, value comes from self.species
+            - evaluator - fitness evaluator to use. If not given,
+              value comes from self.evaluator
         """
         self.organisms = []
 
+        if 'evaluator' in kw:
+            self.evaluator = kw['evaluator']
+
+        self.resetFitnessCache()
+
         if 'species' in kw:
             species = self.species = kw['species']
         else:
@@ -108,6 +181,15 @@ class Population(PGXmlMixin):
             for i in range(init):
                 self.add(species())
 
+    def resetFitnessCache(self):
+        """
+        Creates an empty fitness cache of self.fitnessCacheSize,
+        or removes the cache if the size is 0
+        """
+        self.fitnessCache = None
+        if self.fitnessCacheSize:
+            self.fitnessCache = FitnessCache(self.fitnessCacheSize)
+
     def add(self, *args):
         """
         Add an organism, or a population of organisms,
@@ -150,14 +232,11 @@ class Population(PGXmlMixin):
         Favours fitter members
         """
         if items == None:
+            self.sort()
             items = self.organisms
 
-        nitems = len(items)
-        n2items = nitems * nitems
-
         # pick one parent randomly, favouring fittest
-        idx = int(sqrt(randrange(n2items)))
-        return items[nitems - idx - 1]
+        return items[self.selection.pick(items)[0]]
 
     def gen(self, nfittest=None, nchildren=None):
         """
@@ -178,51 +257,79 @@ class Population(PGXmlMixin):
         if not nchildren:
             nchildren = self.childCount
 
-        children = []
-
         # add in some new random organisms, if required
-        if self.numNewOrganisms:
-            #print "adding %d new organisms" % self.numNewOrganisms
-            for i in range(self.numNewOrganisms):
-                self.add(self.species())
-
-
-        # we use square root to skew the selection probability to
-        # the fittest
+        self.addNewOrganisms()
 
         # get in order, if not already
         self.sort()
-        nadults = len(self)
 
-        n2adults = nadults * nadults
+        children = self.breed(nchildren)
+        self.evaluate(children)
+
+        # and add in some mutants, a proportion of the children
+        # with a bias toward the fittest
+        if not self.mutateAfterMating:
+            mutants = self.breedMutants(children)
+            self.evaluate(mutants)
+            children.extend(mutants)
 
-        # statistical survey
-        #stats = {}
-        #for j in xrange(nchildren):
-        #    stats[j] = 0
+        # take the best 'nfittest', in order of fitness,
+        # make them the new population
+        self.organisms[:] = fittest(children, nfittest)
 
-        # wild orgy, have lots of children
-        nchildren = 1 if nchildren == 1 else nchildren // 2
-        for i in range(nchildren):
-            # pick one parent randomly, favouring fittest
-            idx1 = idx2 = int(sqrt(randrange(n2adults)))
-            parent1 = self[-idx1]
+        self.sorted = True
 
-            # pick another parent, distinct from the first parent
-            while idx2 == idx1:
-                idx2 = int(sqrt(randrange(n2adults)))
-            parent2 = self[-idx2]
+    async def agen(self, nfittest=None, nchildren=None):
+        """
+        Executes a generation of the population, like gen(), but
+        calculates fitness with aevaluate() - for species with an
+        'async def fitness()'
 
-            #print "picking items %s, %s of %s" % (
-            #    nadults - idx1 - 1,
-            #    nadults - idx2 - 1,
-            #    nadults)
+        Must be awaited from within a running asyncio event loop.
+        """
+        if not nfittest:
+            nfittest = self.childCull
+        if not nchildren:
+            nchildren = self.childCount
+
+        self.addNewOrganisms()
+        await self.asort()
+
+        children = self.breed(nchildren)
+        await self.aevaluate(children)
+
+        if not self.mutateAfterMating:
+            mutants = self.breedMutants(children)
+            await self.aevaluate(mutants)
+            children.extend(mutants)
+
+        self.organisms[:] = fittest(children, nfittest)
+
+        self.sorted = True
+
+    def addNewOrganisms(self):
+        """
+        Adds self.numNewOrganisms random organisms to the population
+        """
+        for i in range(self.numNewOrganisms):
+            self.add(self.species())
+
+    def breed(self, nchildren):
+        """
+        Returns about 'nchildren' children of members of this sorted
+        population, plus the 'incest' best members themselves
 
-            #stats[nadults - idx1 - 1] += 1
-            #stats[nadults - idx2 - 1] += 1
+        Children are mutated if mutateAfterMating is set.
+        """
+        adults = self.organisms
+        children = []
 
+        # wild orgy, have lots of children, with parents of
+        # all the couples picked at once, favouring fittest
+        ncouples = 1 if nchildren == 1 else nchildren // 2
+        for idx1, idx2 in self.selection.pairs(adults, ncouples):
             # get it on, and store the child
-            child1, child2 = parent1 + parent2
+            child1, child2 = adults[idx1] + adults[idx2]
 
             # mutate kids if required
             if self.mutateAfterMating:
@@ -233,48 +340,59 @@ class Population(PGXmlMixin):
 
         # if incestuous, add in best adults
         if self.incest:
-            children.extend(self[:self.incest])
+            children.extend(adults[:self.incest])
 
-        for child in children:
-            child.prepare_fitness()
+        return children
 
-        children.sort()
+    def breedMutants(self, children):
+        """
+        Returns mutants of the self.mutants proportion of fittest
+        children, which must have their fitness calculated
+        """
+        numMutants = int(len(children) * self.mutants)
+        return [child.mutate() for child in fittest(children, numMutants)]
 
-        # and add in some mutants, a proportion of the children
-        # with a bias toward the fittest
-        if not self.mutateAfterMating:
-            nchildren = len(children)
-            n2children = nchildren * nchildren
-            mutants = []
-            numMutants = int(nchildren * self.mutants)
-
-            # children[0] - fittest
-            # children[-1] - worse fitness
-            if 0:
-                for i in range(numMutants):
-                    # pick one parent randomly, favouring fittest
-                    idx = int(sqrt(randrange(n2children)))
-
-                    child = children[-idx]
-                    mutant = child.mutate()
-                    mutant.prepare_fitness()
-                    mutants.append(mutant)
-            else:
-                for i in range(numMutants):
-                    mutant = children[i].mutate()
-                    mutant.prepare_fitness()
-                    mutants.append(mutant)
+    def step(self, nchildren=None):
+        """
+        Executes a step of steady-state evolution, an alternative
+        to gen()
 
-            children.extend(mutants)
-            children.sort()
-        #print "added %s mutants" % numMutants
-        # sort the children by fitness
-        # take the best 'nfittest', make them the new population
-        self.organisms[:] = children[:nfittest]
+        Breeds 'nchildren' children from parents selected as in
+        gen(), and inserts them into the population, which stays
+        sorted, in place of the least fit members - so children
+        not fitter than any of the members die straight away.
 
-        self.sorted = True
+        Children are mutated if mutateAfterMating is set, or else
+        are replaced by their mutant with probability self.mutants.
+        """
+        if not nchildren:
+            nchildren = self.stepChildren
+
+        self.sort()
+        adults = self.organisms
+        size = len(adults)
+
+        children = []
+        ncouples = (nchildren + 1) // 2
+        for idx1, idx2 in self.selection.pairs(adults, ncouples):
+            children.extend(adults[idx1] + adults[idx2])
+        del children[nchildren:]
+
+        for i, child in enumerate(children):
+            if self.mutateAfterMating or random.random() < self.mutants:
+                children[i] = child.mutate()
+
+        self.evaluate(children)
+
+        # insert each child after the members as fit as it
+        keys = [adult.fitness_cache for adult in adults]
+        for child in children:
+            key = child.fitness_cache
+            i = bisect_right(keys, key)
+            keys.insert(i, key)
+            adults.insert(i, child)
+        del adults[size:]
 
-        #return stats
     def __repr__(self):
         """
         crude human-readable dump of population's members
@@ -300,10 +418,26 @@ class Population(PGXmlMixin):
         """
         returns the average fitness value for the population
         """
+        self.evaluate(self.organisms)
         fitnesses = [org.get_fitness() for org in self.organisms]
 
         return sum(fitnesses)/len(fitnesses)
 
+    def diversity(self):
+        """
+        returns the proportion of distinct genotypes in the
+        population, from 1.0 when all organisms differ down to
+        1/len(self) when they are all the same, 0.0 for an empty
+        population
+
+        Requires species implementing genotype_key. Cheap for
+        ProgOrganism, whose genotype keys are shared root nodes.
+        """
+        if not self.organisms:
+            return 0.0
+        keys = set([org.genotype_key() for org in self.organisms])
+        return len(keys) / len(self.organisms)
+
     def best(self):
         """
         returns the fittest member of the population
@@ -321,11 +455,131 @@ class Population(PGXmlMixin):
         costly sorting
         """
         if not self.sorted:
-            for organism in self.organisms:
-                organism.prepare_fitness()
-            self.organisms.sort()
+            self.evaluate(self.organisms)
+            self.organisms.sort(key=fitnessOf)
+            self.sorted = True
+
+    async def asort(self):
+        """
+        Sorts this population in order of fitness, like sort(),
+        but calculates fitness with aevaluate()
+        """
+        if not self.sorted:
+            await self.aevaluate(self.organisms)
+            self.organisms.sort(key=fitnessOf)
             self.sorted = True
 
+    def evaluate(self, organisms):
+        """
+        Fills in the fitness cache of those of the given organisms
+        which have no fitness calculated yet.
+
+        All of them are handed to the evaluator in a single batch,
+        so organisms with a cached fitness are never recalculated.
+        With a fitness cache, only one organism of each genotype
+        not found in the cache is evaluated.
+
+        Raises TypeError if the fitness values are awaitable - use
+        aevaluate() for species with an 'async def fitness()'.
+        """
+        groups = self.unevaluated(organisms)
+        if groups:
+            fitnesses = self.evaluator.evaluate(
+                self.species, [group[0] for key, group in groups])
+            try:
+                fitnesses = [checkFitness(fitness) for fitness in fitnesses]
+            except TypeError:
+                for fitness in fitnesses:
+                    if inspect.iscoroutine(fitness):
+                        fitness.close()
+                raise
+            self.setFitness(groups, fitnesses)
+
+    async def aevaluate(self, organisms):
+        """
+        Fills in the fitness cache of the given organisms like
+        evaluate(), but through the evaluator's aevaluate() - which,
+        for a species with an 'async def fitness()', awaits its
+        afitness_batch, running at most self.asyncConcurrency
+        fitness calls at once
+        """
+        groups = self.unevaluated(organisms)
+        if groups:
+            fitnesses = await self.evaluator.aevaluate(
+                self.species, [group[0] for key, group in groups],
+                self.asyncConcurrency)
+            self.setFitness(groups, fitnesses)
+
+    def unevaluated(self, organisms):
+        """
+        Returns the given organisms lacking a fitness value, as a
+        list of (genotype key, organisms) pairs, grouping organisms
+        of equal genotype - only the first of each group needs to
+        be evaluated.
+
+        Organisms found in the fitness cache get their fitness
+        filled in. Without a fitness cache, each group has a single
+        organism, and keys are None - genotype keys are only
+        computed with a cache, once per organism.
+        """
+        pending = [org for org in organisms if org.fitness_cache is None]
+
+        cache = self.fitnessCache
+        if cache is None:
+            return [(None, [organism]) for organism in pending]
+
+        # group organisms missing from the cache by genotype
+        missing = {}
+        for organism in pending:
+            key = organism.genotype_key()
+            if key in missing:
+                cache.hits += 1
+                missing[key].append(organism)
+                continue
+
+            fitness = cache.get(key)
+            if fitness is None:
+                missing[key] = [organism]
+            else:
+                organism.fitness_cache = fitness
+
+        return list(missing.items())
+
+    def setFitness(self, groups, fitnesses):
+        """
+        Sets fitness of groups returned by unevaluated(), and
+        stores it in the fitness cache
+        """
+        cache = self.fitnessCache
+        for (key, group), fitness in zip(groups, fitnesses):
+            if cache is not None:
+                cache.put(key, fitness)
+            for organism in group:
+                organism.fitness_cache = fitness
+
+    # methods for saving/restoring binary checkpoints
+
+    def save(self, path):
+        """
+        Saves a checkpoint of this population - its parameters,
+        members with their fitness, and the random generator state -
+        into a compact binary file, see pygene.checkpoint
+
+        Species must implement genotype_key and from_genotype_key.
+        """
+        checkpoint.save(self, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns a population restored from a checkpoint file
+        written by save(), and restores the random generator state
+
+        The fitness cache, if any, starts empty.
+        """
+        with open(path, 'rb') as fileobj:
+            return checkpoint.load(cls, fileobj)
+
     # methods for loading/saving to/from xml
 
     def xmlDumpSelf(self, doc, parent):
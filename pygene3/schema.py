@@ -0,0 +1,102 @@
+"""
+pygene/schema.py - Precomputed layout of a species' genome
+
+A genome is a dict mapping gene names to gene classes. Organism
+operators used to walk that dict (and sort its keys) for every
+organism made. A GenomeSchema freezes it, once per species, into
+the vectors those operators index into:
+    - names - gene names, in genome order
+    - index - dict mapping gene names to their position
+    - classes - gene classes, in genome order
+    - items - (name, gene class) pairs, in genome order
+    - sortedNames - gene names in sorted order, the order in which
+      GenomeSplitOrganism cuts the genome
+    - numgenes - number of genes
+    - randMin, randMax, mutProb, mutAmt - lists of these gene class
+      attributes, in genome order, None for genes lacking them
+    - mutationGroups - list of (gene class, indexes) tuples, grouping
+      the positions of genes of the same class, so that mutation can
+      sample the mutating genes of each group at once with
+      sparseIndexes()
+    - customMutation - positions of genes whose class overrides
+      maybeMutated (or the older maybeMutate), which must be asked
+      one by one
+    - randomPhenotypes - set of the names of genes whose class has
+      randomPhenotype set, whose pair phenotypes aren't cached
+
+Get the schema of a species with its schema() classmethod. It is
+computed on first use, and again whenever the species' 'genome'
+attribute is replaced. Genomes shouldn't be modified in place once
+the species is in use. Mutation reads the gene classes' mutProb as
+it goes, so the mutation rate may be changed at run time (eg. to
+anneal it), but the attribute lists above are snapshots.
+"""
+
+from .gene import BaseGene, sparseIndexes
+
+
+class GenomeSchema(object):
+    """
+    Frozen layout of a genome - see module docstring
+    """
+    def __init__(self, genome):
+        # the genome this schema was made from
+        self.genome = genome
+
+        self.names = tuple(genome.keys())
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+        self.classes = tuple(genome[name] for name in self.names)
+        self.items = tuple(zip(self.names, self.classes))
+        self.sortedNames = tuple(sorted(self.names))
+        self.numgenes = len(self.names)
+
+        self.randMin = self.column('randMin')
+        self.randMax = self.column('randMax')
+        self.mutProb = self.column('mutProb')
+        self.mutAmt = self.column('mutAmt')
+
+        groups = {}
+        custom = []
+        for i, cls in enumerate(self.classes):
+            if (getattr(cls, 'maybeMutated', None) is BaseGene.maybeMutated
+                    and cls.maybeMutate is BaseGene.maybeMutate):
+                groups.setdefault(cls, []).append(i)
+            else:
+                custom.append(i)
+        self.mutationGroups = [(cls, tuple(indexes))
+                               for cls, indexes in groups.items()]
+        self.customMutation = tuple(custom)
+
+        self.randomPhenotypes = frozenset(
+            name for name, cls in self.items
+            if getattr(cls, 'randomPhenotype', False))
+
+    def column(self, attr):
+        """
+        Returns the list of a class attribute of the genes,
+        in genome order, None for genes lacking it
+        """
+        return [getattr(cls, attr, None) for cls in self.classes]
+
+    def mutatingIndexes(self, copies=1):
+        """
+        Returns the positions of the genes picked to mutate, each with
+        its gene's mutProb, skipping genes with custom mutation
+
+        With 'copies' above 1, positions cover that many copies of
+        the genome - position p stands for gene p // copies, copy
+        p % copies - eg. copies=2 for the gene pairs of
+        MendelOrganism.
+
+        Costs in proportion to the number of picked genes, rather
+        than to the length of the genome.
+        """
+        picked = []
+        for cls, indexes in self.mutationGroups:
+            n = len(indexes)
+            for p in sparseIndexes(n * copies, cls.mutProb):
+                picked.append(indexes[p // copies] * copies + p % copies)
+        return picked
+
+    def __repr__(self):
+        return "<GenomeSchema:%d genes>" % self.numgenes
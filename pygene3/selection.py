@@ -0,0 +1,193 @@
+"""
+pygene/selection.py - Strategies for picking parents from a population
+
+A selection strategy picks indexes of organisms from a list sorted
+in order of fitness, fittest first. All the draws of a generation are
+made at once, from a table of cumulative weights prepared once per
+generation, instead of one random draw per parent.
+
+Available strategies:
+    - SqrtSelection - the classic pygene scheme, the chance of an
+      organism being picked falls linearly with its rank, down to
+      almost nothing for the least fit one (the default)
+    - RankSelection - linear ranking with adjustable pressure
+    - RouletteSelection - chance proportional to 1 / (1 + f - fbest)
+      where f is the organism's fitness
+    - TournamentSelection - fittest of 'size' organisms picked
+      uniformly at random
+
+Set the 'selection' attribute of a Population to use a strategy:
+
+    class MyPopulation(Population):
+        species = MyOrganism
+        selection = TournamentSelection(size=3)
+"""
+
+from random import choices, randrange
+from itertools import accumulate
+
+
+class Selection(object):
+    """
+    Base class for selection strategies
+
+    Subclasses override 'table', and possibly 'draw'
+    """
+    # number of times a second parent equal to the first one is
+    # redrawn before picking it uniformly among the other organisms
+    maxRedraws = 10
+
+    def table(self, organisms):
+        """
+        Prepares the selection table for a list of organisms,
+        sorted fittest first
+
+        By default, the table is the list of cumulative weights
+        of the organisms
+        """
+        raise Exception("method 'table' not implemented")
+
+    def draw(self, table, k):
+        """
+        Returns a list of 'k' indexes drawn using a table
+        """
+        return choices(range(len(table)), cum_weights=table, k=k)
+
+    def pick(self, organisms, k=1):
+        """
+        Returns a list of 'k' indexes into organisms, sorted fittest
+        first, drawn with replacement
+        """
+        return self.draw(self.table(organisms), k)
+
+    def pairs(self, organisms, n):
+        """
+        Returns a list of 'n' pairs of indexes of parents, drawn
+        from organisms sorted fittest first
+
+        Both parents of a pair are distinct organisms, as long as
+        there are at least 2 of them. When the weights leave a single
+        organism any chance (a degenerate table), second parents are
+        picked uniformly among the other organisms after 'maxRedraws'
+        failed redraws.
+        """
+        table = self.table(organisms)
+        draws = self.draw(table, 2 * n)
+        first = draws[0::2]
+        second = draws[1::2]
+
+        # redraw the few second parents which equal the first one
+        count = len(organisms)
+        if count > 1:
+            for i in range(n):
+                redraws = 0
+                while first[i] == second[i]:
+                    if redraws == self.maxRedraws:
+                        other = randrange(count - 1)
+                        second[i] = other + (other >= first[i])
+                        break
+                    second[i] = self.draw(table, 1)[0]
+                    redraws += 1
+
+        return list(zip(first, second))
+
+
+class RankTableSelection(Selection):
+    """
+    Base class for strategies whose weights only depend on
+    the organisms' rank
+
+    Tables are computed once per population size.
+    """
+    def __init__(self):
+        self.tables = {}
+
+    def weights(self, n):
+        """
+        Returns the list of weights of ranks 0 (fittest) to n-1
+
+        Must be overridden
+        """
+        raise Exception("method 'weights' not implemented")
+
+    def table(self, organisms):
+        n = len(organisms)
+        try:
+            return self.tables[n]
+        except KeyError:
+            table = self.tables[n] = list(accumulate(self.weights(n)))
+            return table
+
+
+class SqrtSelection(RankTableSelection):
+    """
+    Chance of picking the organism of rank r (0 is the fittest)
+    out of n is proportional to 2 * (n - r) - 1
+
+    It is the distribution of n - 1 - int(sqrt(randrange(n * n))),
+    which pygene used to draw parents with.
+    """
+    def weights(self, n):
+        return [2 * (n - r) - 1 for r in range(n)]
+
+
+class RankSelection(RankTableSelection):
+    """
+    Linear ranking - the fittest organism is 'pressure' times more
+    likely to be picked than an average one, and the least fit one
+    2 - pressure times
+
+    Arguments:
+        - pressure - default 1.5 - selection pressure, from 1.0
+          (uniform choice) to 2.0 (least fit organism never picked)
+    """
+    def __init__(self, pressure=1.5):
+        RankTableSelection.__init__(self)
+        if not 1.0 <= pressure <= 2.0:
+            raise ValueError("pressure must be between 1.0 and 2.0")
+        self.pressure = pressure
+
+    def weights(self, n):
+        if n == 1:
+            return [1.0]
+        s = self.pressure
+        return [(2 - s) + 2 * (s - 1) * (n - 1 - r) / (n - 1)
+                for r in range(n)]
+
+
+class RouletteSelection(Selection):
+    """
+    Fitness proportionate selection, adapted to fitness values
+    where lower is better
+
+    Chance of picking an organism is proportional to
+    1 / (1 + f - fbest), where f is its fitness and fbest is the
+    fitness of the fittest organism. Organisms must have their
+    fitness calculated.
+    """
+    def table(self, organisms):
+        best = organisms[0].fitness_cache
+        return list(accumulate(
+            [1.0 / (1.0 + org.fitness_cache - best) for org in organisms]))
+
+
+class TournamentSelection(Selection):
+    """
+    Picks the fittest of 'size' organisms chosen uniformly
+    at random
+
+    Arguments:
+        - size - default 2 - number of organisms in a tournament
+    """
+    def __init__(self, size=2):
+        self.size = size
+
+    def table(self, organisms):
+        return len(organisms)
+
+    def draw(self, table, k):
+        size = self.size
+        contestants = choices(range(table), k=k * size)
+        # organisms are sorted, so the fittest has the lowest index
+        return [min(contestants[i:i+size])
+                for i in range(0, len(contestants), size)]
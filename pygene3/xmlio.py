@@ -15,6 +15,9 @@ class PGXmlMixin(object):
     mixin class to support pygene classes
     serialising themselves to/from xml
     """
+    # no instance dict of its own, so genes can use slots
+    __slots__ = ()
+
     def xmlDump(self, fileobj):
         """
         Dumps out the population to an open file in XML format.
@@ -0,0 +1,79 @@
+"""
+Smoke tests for pygene3.arraypop
+"""
+
+import unittest
+
+from pygene3.gene import FloatGene, IntGene
+from pygene3.organism import Organism
+from pygene3.arraypop import ArrayPopulation, rowSpecies
+
+
+class Float(FloatGene):
+    randMin = -1.0
+    randMax = 1.0
+    mutProb = 0.3
+    mutAmt = 0.5
+
+
+class Int(IntGene):
+    randMin = 0
+    randMax = 10
+    mutProb = 0.3
+    mutAmt = 2
+
+
+class Species(Organism):
+    genome = dict([('f%d' % i, Float) for i in range(5)] +
+                  [('i%d' % i, Int) for i in range(5)])
+    crossoverRate = 0.3
+
+    def fitness(self):
+        return sum([self['f%d' % i] ** 2 + self['i%d' % i]
+                    for i in range(5)])
+
+
+class SpeciesPopulation(ArrayPopulation):
+    species = Species
+    initPopulation = 10
+    childCount = 20
+    childCull = 10
+
+
+class ArrayPopulationTest(unittest.TestCase):
+
+    def test_crossover(self):
+        layout = rowSpecies(Species).layout
+        parents1 = [[0] * 10 for i in range(200)]
+        parents2 = [[1] * 10 for i in range(200)]
+        children = layout.crossover(parents1, parents2)
+        self.assertEqual(len(children), 400)
+        fromFirst = 0
+        for child1, child2 in zip(children[0::2], children[1::2]):
+            self.assertEqual([a + b for a, b in zip(child1, child2)],
+                             [1] * 10)
+            fromFirst += child1.count(0)
+        # 2000 genes, each from the first parent with probability .3
+        self.assertTrue(450 < fromFirst < 750, fromFirst)
+        self.assertEqual(parents1[0], [0] * 10)
+
+    def test_mutated_rows_in_range(self):
+        layout = rowSpecies(Species).layout
+        rows = [layout.randomRow() for i in range(50)]
+        before = [list(row) for row in rows]
+        layout.mutateRows(rows)
+        self.assertNotEqual(rows, before)
+        for row in rows:
+            for value, lo, hi in zip(row, layout.randMin, layout.randMax):
+                self.assertTrue(lo <= value <= hi)
+
+    def test_generations(self):
+        pop = SpeciesPopulation()
+        for i in range(10):
+            pop.gen()
+        self.assertEqual(len(pop), 10)
+        self.assertTrue(isinstance(pop.best(), rowSpecies(Species)))
+
+
+if __name__ == '__main__':
+    unittest.main()
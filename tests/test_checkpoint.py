@@ -0,0 +1,83 @@
+"""
+Smoke tests for pygene3.checkpoint
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from pygene3.gene import FloatGene, IntGene
+from pygene3.organism import Organism
+from pygene3.population import Population
+
+
+class Float(FloatGene):
+    randMin = -1.0
+    randMax = 1.0
+
+
+class Int(IntGene):
+    randMin = 0
+    randMax = 100
+
+
+class Species(Organism):
+    genome = {'f': Float, 'i': Int}
+
+    def fitness(self):
+        return self['f'] ** 2 + self['i']
+
+
+class SpeciesPopulation(Population):
+    species = Species
+    initPopulation = 10
+    childCount = 20
+    childCull = 10
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def roundTrip(self, path):
+        pop = SpeciesPopulation()
+        pop.gen()
+        pop.childCull = 12
+        pop.save(path)
+        state = random.getstate()
+        random.random()
+
+        loaded = SpeciesPopulation.load(path)
+        self.assertEqual(random.getstate(), state)
+        self.assertEqual(loaded.childCull, 12)
+        self.assertEqual(
+            [org.genotype_key() for org in loaded.organisms],
+            [org.genotype_key() for org in pop.organisms])
+        self.assertEqual(
+            [org.fitness_cache for org in loaded.organisms],
+            [org.fitness_cache for org in pop.organisms])
+
+    def test_round_trip(self):
+        self.roundTrip(os.path.join(self.dir, 'pop.ck'))
+
+    def test_round_trip_pathlib(self):
+        path = Path(self.dir) / 'pop.ck'
+        self.roundTrip(path)
+        self.assertEqual(os.listdir(self.dir), ['pop.ck'])
+
+    def test_bad_magic(self):
+        path = os.path.join(self.dir, 'junk')
+        with open(path, 'wb') as fileobj:
+            fileobj.write(b'not a checkpoint')
+        self.assertRaises(Exception, SpeciesPopulation.load, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
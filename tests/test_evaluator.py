@@ -0,0 +1,102 @@
+"""
+Smoke tests for pygene3.evaluator
+"""
+
+import unittest
+
+from pygene3.gene import IntGene
+from pygene3.organism import Organism
+from pygene3.population import Population
+from pygene3.evaluator import (FitnessCache, SerialEvaluator,
+                               ThreadEvaluator, ProcessEvaluator)
+
+
+class Gene(IntGene):
+    randMin = 0
+    randMax = 3
+
+
+class Species(Organism):
+    genome = {'a': Gene, 'b': Gene}
+    calls = 0
+
+    def fitness(self):
+        Species.calls += 1
+        return self['a'] * 10 + self['b']
+
+
+class KeyedSpecies(Species):
+    keys = 0
+
+    def genotype_key(self):
+        KeyedSpecies.keys += 1
+        return Species.genotype_key(self)
+
+
+class CachedPopulation(Population):
+    species = Species
+    initPopulation = 30
+    fitnessCacheSize = 100
+
+
+class FitnessCacheTest(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = FitnessCache(2)
+        cache.put('a', 1.0)
+        cache.put('b', 2.0)
+        self.assertEqual(cache.get('a'), 1.0)
+        cache.put('c', 3.0)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1.0)
+        self.assertEqual(cache.get('c'), 3.0)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_put_refreshes_key(self):
+        cache = FitnessCache(2)
+        cache.put('a', 1.0)
+        cache.put('b', 2.0)
+        cache.put('a', 4.0)
+        cache.put('c', 3.0)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 4.0)
+
+    def test_clear(self):
+        cache = FitnessCache(2)
+        cache.put('a', 1.0)
+        cache.get('a')
+        cache.clear()
+        self.assertEqual((len(cache), cache.hits, cache.misses), (0, 0, 0))
+
+    def test_population_evaluates_each_genotype_once(self):
+        Species.calls = 0
+        pop = CachedPopulation()
+        pop.sort()
+        genotypes = set([org.genotype_key() for org in pop.organisms])
+        self.assertEqual(Species.calls, len(genotypes))
+        for org in pop.organisms:
+            self.assertEqual(org.fitness_cache, org.fitness())
+
+    def test_genotype_keys_computed_once(self):
+        pop = CachedPopulation(species=KeyedSpecies, init=30)
+        KeyedSpecies.keys = 0
+        pop.sort()
+        self.assertEqual(KeyedSpecies.keys, 30)
+
+
+class EvaluatorTest(unittest.TestCase):
+
+    def test_results_in_order(self):
+        organisms = [Species() for i in range(37)]
+        expected = [org.fitness() for org in organisms]
+        for evaluator in (SerialEvaluator(), ThreadEvaluator(workers=3),
+                          ProcessEvaluator(workers=2, chunkSize=5)):
+            with evaluator:
+                self.assertEqual(
+                    evaluator.evaluate(Species, organisms), expected)
+                self.assertEqual(evaluator.evaluate(Species, []), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
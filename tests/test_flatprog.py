@@ -0,0 +1,94 @@
+"""
+Smoke tests for pygene3.flatprog
+"""
+
+import unittest
+
+from pygene3.prog import typed
+from pygene3.flatprog import FlatProgOrganism, subtreeEnds
+
+
+def add(x, y):
+    return x + y
+
+
+@typed(float, float, float)
+def tadd(x, y):
+    return x + y
+
+
+@typed(float, bool, float, float)
+def iif(x, y, z):
+    return y if x else z
+
+
+@typed(bool, float, float)
+def greater(x, y):
+    return x > y
+
+
+class Prog(FlatProgOrganism):
+    funcs = {'+': add}
+    vars = ['x']
+    consts = [1.0]
+    initDepth = 4
+
+    def fitness(self):
+        return 0.0
+
+
+class TypedProg(FlatProgOrganism):
+    funcs = {'+': tadd, 'iif': iif, '>': greater}
+    vars = [('x', float)]
+    consts = [1.0, True]
+    type = float
+    initDepth = 4
+
+    def fitness(self):
+        return 0.0
+
+
+class FlatProgTest(unittest.TestCase):
+
+    def assertWellFormed(self, org):
+        self.assertEqual(list(org.ends), list(subtreeEnds(org.ops,
+                                                          org.opArity)))
+        if org.type:
+            org.checkTypes(org.ops, org.ends)
+
+    def test_mutate_and_mate_keep_programs_well_formed(self):
+        for species in (Prog, TypedProg):
+            orgs = [species() for i in range(10)]
+            for i in range(50):
+                org = orgs[i % 10]
+                mutant = org.mutate()
+                self.assertWellFormed(mutant)
+                child1, child2 = org.mate(orgs[(i + 3) % 10])
+                self.assertWellFormed(child1)
+                self.assertWellFormed(child2)
+                self.assertEqual(len(child1.ops) + len(child2.ops),
+                                 len(org.ops) + len(orgs[(i + 3) % 10].ops))
+                orgs[i % 10] = mutant
+
+    def test_mutate_single_terminal(self):
+        org = Prog.from_genotype_key((('var', 'x'),))
+        self.assertEqual(len(org.ops), 1)
+        mutant = org.mutate()
+        self.assertWellFormed(mutant)
+        self.assertTrue(org.opArity[mutant.ops[0]])
+        self.assertEqual(len(org.ops), 1)
+
+    def test_genotype_key_round_trip(self):
+        org = TypedProg()
+        key = org.genotype_key()
+        self.assertEqual(TypedProg.from_genotype_key(key).genotype_key(), key)
+
+    def test_const_codes(self):
+        self.assertNotEqual(Prog.constCode(0.0), Prog.constCode(-0.0))
+        self.assertNotEqual(Prog.constCode(1), Prog.constCode(1.0))
+        self.assertEqual(Prog.constCode(float('nan')),
+                         Prog.constCode(float('nan')))
+
+
+if __name__ == '__main__':
+    unittest.main()
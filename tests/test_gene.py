@@ -0,0 +1,164 @@
+"""
+Smoke tests for pygene3.gene
+"""
+
+import random
+import unittest
+
+from pygene3.gene import (FloatGene, IntGene, DiscreteGene,
+                          FloatGeneFactory, sparseIndexes)
+from pygene3.organism import Organism
+
+
+class SparseIndexesTest(unittest.TestCase):
+
+    def test_bounds(self):
+        self.assertEqual(sparseIndexes(10, 0.0), [])
+        self.assertEqual(sparseIndexes(10, -1.0), [])
+        self.assertEqual(sparseIndexes(10, 1.0), list(range(10)))
+        self.assertEqual(sparseIndexes(0, 0.5), [])
+
+    def test_tiny_probabilities(self):
+        for prob in (1e-17, 1e-200, 5e-324):
+            self.assertEqual(sparseIndexes(10, prob), [])
+            self.assertEqual(sparseIndexes(10 ** 6, prob), [])
+
+    def test_distribution(self):
+        random.seed(1)
+        indexes = sparseIndexes(100000, 0.3)
+        self.assertEqual(indexes, sorted(set(indexes)))
+        self.assertTrue(0 <= indexes[0] and indexes[-1] < 100000)
+        self.assertTrue(29000 < len(indexes) < 31000, len(indexes))
+
+
+class Fixed(IntGene):
+    randMin = 0
+    randMax = 100
+    value = 42
+
+
+class Tagged(FloatGene):
+    __slots__ = ('tag',)
+    randMin = 0.0
+    randMax = 1.0
+
+
+class GeneSlotsTest(unittest.TestCase):
+
+    def test_genes_have_no_dict(self):
+        random.seed(1)
+        for cls in (Fixed, Tagged, FloatGeneFactory('F', randMin=0.0,
+                                                     randMax=1.0)):
+            gene = cls()
+            self.assertFalse(hasattr(gene, '__dict__'))
+            self.assertRaises(AttributeError, setattr, gene, 'other', 1)
+
+    def test_class_value_is_initial_value(self):
+        self.assertEqual(Fixed.initValue, 42)
+        self.assertEqual(Fixed.value, 42)
+        self.assertEqual(Fixed().value, 42)
+        cls = type('Changed', (Fixed,), {})
+        cls.value = 7
+        self.assertEqual((cls.initValue, cls().value), (7, 7))
+        gene = FloatGeneFactory('Half', randMin=0.0, randMax=1.0,
+                                value=0.5)()
+        self.assertEqual(gene.value, 0.5)
+
+    def test_declared_slots(self):
+        gene = Tagged()
+        gene.tag = 'x'
+        self.assertEqual(gene.tag, 'x')
+        self.assertTrue(0.0 <= gene.value <= 1.0)
+
+    def test_slotted_genes_in_organism(self):
+        random.seed(2)
+        species = type('Species', (Organism,), {
+            'genome': {'a': Fixed, 'b': Tagged},
+            'fitness': lambda self: 0.0})
+        org = species()
+        self.assertEqual(org['a'], 42)
+        child1, child2 = org + species()
+        self.assertEqual(child1['a'], 42)
+        self.assertTrue(0 <= org.mutate()['a'] <= 100)
+
+
+def expectedPhenotype(cls, allele1, allele2):
+    """
+    Phenotype of a pair of alleles, worked out the way
+    DiscreteGene.__add__ did before the phenotype table
+    """
+    if cls.dominant in (allele1, allele2):
+        return (cls.dominant,)
+    if cls.codominant:
+        phenotype = []
+        for val in allele1, allele2:
+            if val in cls.codominant and val not in phenotype:
+                phenotype.append(val)
+        if not phenotype and cls.recessive:
+            phenotype.append(cls.recessive)
+        return tuple(phenotype)
+    if cls.recessive:
+        return (cls.recessive,)
+    return ()
+
+
+class Dominant(DiscreteGene):
+    alleles = ['brown', 'blue', 'green']
+    dominant = 'brown'
+
+
+class Codominant(DiscreteGene):
+    alleles = ['red', 'white', 'pink', 'none']
+    codominant = ['red', 'white']
+    recessive = 'none'
+
+
+class CodominantAndDominant(DiscreteGene):
+    alleles = ['a', 'b', 'c', 'd']
+    dominant = 'a'
+    codominant = ['b', 'c']
+
+
+class Recessive(DiscreteGene):
+    alleles = ['x', 'y']
+    recessive = 'y'
+
+
+class Plain(DiscreteGene):
+    alleles = ['p', 'q']
+
+
+class DiscreteGeneTest(unittest.TestCase):
+
+    def assertTableMatches(self, cls):
+        for allele1 in cls.alleles:
+            for allele2 in cls.alleles:
+                gene1, gene2 = cls(), cls()
+                gene1.value = allele1
+                gene2.value = allele2
+                self.assertEqual(gene1 + gene2,
+                                 expectedPhenotype(cls, allele1, allele2))
+
+    def test_phenotype_table(self):
+        for cls in (Dominant, Codominant, CodominantAndDominant,
+                    Recessive, Plain):
+            self.assertEqual(len(cls.phenotypeTable), cls.numAlleles ** 2)
+            self.assertTableMatches(cls)
+
+    def test_table_rebuilt_when_dominance_changes(self):
+        cls = type('Changed', (Dominant,), {})
+        cls.dominant = 'green'
+        self.assertTableMatches(cls)
+        cls.alleles = ['green', 'grey']
+        self.assertTableMatches(cls)
+
+    def test_value_and_code(self):
+        gene = Dominant()
+        gene.value = 'green'
+        self.assertEqual((gene.code, gene.value), (2, 'green'))
+        self.assertEqual(gene.copy().value, 'green')
+        self.assertRaises(Exception, setattr, gene, 'value', 'purple')
+
+
+if __name__ == '__main__':
+    unittest.main()
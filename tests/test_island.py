@@ -0,0 +1,62 @@
+"""
+Smoke tests for pygene3.island
+"""
+
+import unittest
+
+from pygene3.gene import FloatGene
+from pygene3.organism import Organism
+from pygene3.population import Population
+from pygene3.island import IslandModel, _emigrants, _immigrate
+
+
+class Gene(FloatGene):
+    randMin = -10.0
+    randMax = 10.0
+
+
+class Square(Organism):
+    genome = {'x': Gene, 'y': Gene}
+
+    def fitness(self):
+        return self['x'] ** 2 + self['y'] ** 2
+
+
+class SquarePopulation(Population):
+    species = Square
+    initPopulation = 8
+    childCount = 16
+    childCull = 8
+
+
+class IslandTest(unittest.TestCase):
+
+    def test_immigrants_replace_least_fit(self):
+        pop = SquarePopulation()
+        size = len(pop)
+        migrants = [(Square(x=Gene, y=Gene).genotype_key(), -1.0)]
+        _immigrate(pop, migrants)
+        self.assertEqual(len(pop), size)
+        self.assertEqual(pop.organisms[0].fitness_cache, -1.0)
+        self.assertEqual(_emigrants(pop, 1), migrants)
+
+    def test_destinations(self):
+        model = IslandModel(SquarePopulation, islands=4)
+        self.assertEqual(model.destinations(), [1, 2, 3, 0])
+        model.topology = 'random'
+        for i in range(20):
+            for source, dest in enumerate(model.destinations()):
+                self.assertNotEqual(source, dest)
+
+    def test_run(self):
+        with IslandModel(SquarePopulation, islands=2, migrationInterval=2,
+                         migrants=1, seed=1) as model:
+            best = model.run(5)
+            self.assertEqual(model.generation, 5)
+            self.assertTrue(isinstance(best, Square))
+            self.assertEqual(best.fitness_cache, best.fitness())
+            self.assertEqual(len(model.best(3)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Smoke tests for the phenotype cache of pygene3.organism.MendelOrganism
+"""
+
+import random
+import unittest
+
+from pygene3.gene import FloatGeneMax, FloatGeneExchange
+from pygene3.organism import MendelOrganism
+
+
+class Max(FloatGeneMax):
+    randMin = 0.0
+    randMax = 1.0
+
+
+class Exchange(FloatGeneExchange):
+    randMin = 0.0
+    randMax = 1.0
+
+
+class Mendel(MendelOrganism):
+    genome = {'1': Max, 'x': Exchange}
+
+    def fitness(self):
+        return 0.0
+
+
+class MendelPhenotypeTest(unittest.TestCase):
+
+    def test_cached_phenotype(self):
+        org = Mendel()
+        value = org['1']
+        self.assertEqual(value, max(g.value for g in org.genes['1']))
+        self.assertEqual(org.phenotype_cache, {'1': value})
+
+    def test_non_str_key_hits_cache(self):
+        org = Mendel()
+        value = org[1]
+        self.assertEqual(org.phenotype_cache, {'1': value})
+        org.phenotype_cache['1'] = 'cached'
+        self.assertEqual(org[1], 'cached')
+
+    def test_random_phenotype_not_cached(self):
+        org = Mendel(x=(Exchange(), Exchange()))
+        values = set(g.value for g in org.genes['x'])
+        seen = set(org['x'] for i in range(200))
+        self.assertEqual(seen, values)
+        self.assertNotIn('x', org.phenotype_cache)
+
+    def test_phenotype_vector(self):
+        org = Mendel()
+        vector = org.phenotype_vector()
+        self.assertEqual(vector[0], org['1'])
+        self.assertIn(vector[1], [g.value for g in org.genes['x']])
+
+
+class Pair(MendelOrganism):
+    genome = dict(('g%d' % i, Max) for i in range(8))
+
+    def fitness(self):
+        return 0.0
+
+
+class MendelMateTest(unittest.TestCase):
+
+    def test_children_complementary(self):
+        random.seed(3)
+        a, b = Pair(), Pair()
+        for i in range(20):
+            child1, child2 = a + b
+            for name in Pair.genome:
+                ours, theirs = a.genes[name], b.genes[name]
+                gene1, gene2 = child1.genes[name], child2.genes[name]
+                # as with gametes - the first gene of each child comes
+                # from this organism, the second from the partner, and
+                # the children get the two genes of each parent's pair
+                self.assertEqual(set(map(id, (gene1[0], gene2[0]))),
+                                 set(map(id, ours)))
+                self.assertEqual(set(map(id, (gene1[1], gene2[1]))),
+                                 set(map(id, theirs)))
+
+    def test_alleles_drawn_evenly(self):
+        random.seed(5)
+        a, b = Pair(), Pair()
+        trials = 2000
+        fromFirst = [0, 0]
+        for i in range(trials):
+            child1, child2 = a + b
+            for name in Pair.genome:
+                gene = child1.genes[name]
+                fromFirst[0] += gene[0] is a.genes[name][0]
+                fromFirst[1] += gene[1] is b.genes[name][0]
+        # each of 16000 draws is 0.5 - 4 standard deviations is 253
+        n = trials * len(Pair.genome)
+        for count in fromFirst:
+            self.assertTrue(abs(count - n / 2) < 253, count)
+
+    def test_gamete_version_agrees(self):
+        random.seed(7)
+        a, b = Pair(), Pair()
+        ours, theirs = a.split(), b.split()
+        child = Pair(ours[0], theirs[1])
+        for name in Pair.genome:
+            self.assertIn(child.genes[name][0], a.genes[name])
+            self.assertIn(child.genes[name][1], b.genes[name])
+
+
+if __name__ == '__main__':
+    unittest.main()
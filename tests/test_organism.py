@@ -0,0 +1,202 @@
+"""
+Smoke tests for pygene3.organism
+"""
+
+import random
+import unittest
+
+from pygene3.gene import FloatGene
+from pygene3.organism import Organism, MendelOrganism
+from pygene3.population import Population, fittest
+
+
+class Gene(FloatGene):
+    randMin = -10.0
+    randMax = 10.0
+    mutAmt = 0.5
+    mutProb = 0.3
+
+
+class Square(Organism):
+    genome = dict(('x%d' % i, Gene) for i in range(6))
+
+    def fitness(self):
+        return sum([gene.value ** 2 for gene in self.genes.values()])
+
+
+class Batched(Square):
+    batches = []
+    prepared = 0
+
+    def prepare_fitness(self):
+        Batched.prepared += 1
+
+    @classmethod
+    def fitness_batch(cls, organisms):
+        cls.batches.append(len(organisms))
+        for organism in organisms:
+            assert organism.fitness_cache is None
+        return Square.fitness_batch.__func__(cls, organisms)
+
+
+class BatchedPopulation(Population):
+    species = Batched
+    initPopulation = 10
+    childCount = 20
+    childCull = 10
+    incest = 2
+
+
+class FitnessBatchTest(unittest.TestCase):
+
+    def test_one_batch_per_evaluation(self):
+        random.seed(1)
+        Batched.batches = []
+        Batched.prepared = 0
+        pop = BatchedPopulation()
+        pop.gen()
+        # the initial population, then the children - the incest
+        # parents keep their fitness
+        self.assertEqual(Batched.batches, [10, 20])
+        self.assertEqual(Batched.prepared, 30)
+        for org in pop.organisms:
+            self.assertEqual(org.fitness_cache, org.fitness())
+
+
+class Scored(object):
+    """
+    Stand-in organism with a computed fitness
+    """
+    def __init__(self, fitness):
+        self.fitness_cache = fitness
+
+
+class SquarePopulation(Population):
+    species = Square
+    initPopulation = 10
+    childCount = 30
+    childCull = 8
+
+
+class CullTest(unittest.TestCase):
+
+    def test_fittest(self):
+        organisms = [Scored(f) for f in [5, 1, 3, 1, 2, 5, 0]]
+        best = fittest(organisms, 4)
+        self.assertEqual([org.fitness_cache for org in best], [0, 1, 1, 2])
+        # ties keep their order
+        self.assertIs(best[1], organisms[1])
+        self.assertIs(best[2], organisms[3])
+        self.assertEqual(len(fittest(organisms, 10)), 7)
+        self.assertEqual(fittest(organisms, 0), [])
+
+    def test_gen_culls_to_fittest_children(self):
+        random.seed(4)
+        pop = SquarePopulation()
+        best = pop.best().get_fitness()
+        for i in range(15):
+            pop.gen()
+            fitnesses = [org.fitness_cache for org in pop.organisms]
+            self.assertEqual(len(fitnesses), 8)
+            self.assertEqual(fitnesses, sorted(fitnesses))
+            # the best parents are among the children
+            self.assertLessEqual(fitnesses[0], best)
+            best = fitnesses[0]
+
+
+class SharedGenesTest(unittest.TestCase):
+
+    def test_mutant_shares_unmutated_genes(self):
+        random.seed(6)
+        org = Square()
+        values = dict((name, gene.value) for name, gene in org.genes.items())
+        shared = copied = 0
+        for i in range(50):
+            mutant = org.mutate()
+            for name, gene in mutant.genes.items():
+                if gene is org.genes[name]:
+                    shared += 1
+                else:
+                    copied += 1
+                    self.assertIs(type(gene), Gene)
+        # parents are never changed in place
+        self.assertEqual(
+            dict((name, gene.value) for name, gene in org.genes.items()),
+            values)
+        # 300 genes, each mutating with probability 0.3
+        self.assertTrue(shared and copied)
+        self.assertTrue(60 < copied < 120, copied)
+
+    def test_mutprob_bounds(self):
+        org = Square()
+        try:
+            Gene.mutProb = 0.0
+            mutant = org.mutate()
+            for name, gene in mutant.genes.items():
+                self.assertIs(gene, org.genes[name])
+            Gene.mutProb = 1.0
+            mutant = org.mutate()
+            for name, gene in mutant.genes.items():
+                self.assertIsNot(gene, org.genes[name])
+        finally:
+            Gene.mutProb = 0.3
+
+    def test_children_share_parents_genes(self):
+        random.seed(7)
+        a, b = Square(), Square()
+        child1, child2 = a + b
+        for name in Square.genome:
+            self.assertEqual(set([id(child1.genes[name]),
+                                  id(child2.genes[name])]),
+                             set([id(a.genes[name]), id(b.genes[name])]))
+
+
+class Counted(Square):
+    inits = 0
+
+    def __init__(self, **kw):
+        Counted.inits += 1
+        Square.__init__(self, **kw)
+
+
+class MendelSquare(MendelOrganism):
+    genome = Square.genome
+
+    def fitness(self):
+        return sum([self[name] ** 2 for name in self.genome])
+
+
+class UncheckedConstructorTest(unittest.TestCase):
+
+    def assertValid(self, org, species):
+        self.assertIs(type(org), species)
+        self.assertEqual(sorted(org.genes), sorted(species.genome))
+        self.assertEqual(org.numgenes, len(species.genome))
+        self.assertIsNone(org.fitness_cache)
+
+    def test_children_are_valid(self):
+        random.seed(8)
+        for species in (Square, MendelSquare):
+            a, b = species(), species()
+            a.get_fitness()
+            for org in list(a + b) + [a.mutate(), a.copy()]:
+                self.assertValid(org, species)
+                org.get_fitness()
+            key = a.genotype_key()
+            org = species.from_genotype_key(key)
+            self.assertValid(org, species)
+            self.assertEqual(org.genotype_key(), key)
+
+    def test_overridden_init_still_runs(self):
+        random.seed(9)
+        a, b = Counted(), Counted()
+        Counted.inits = 0
+        child1, child2 = a + b
+        a.mutate()
+        a.copy()
+        self.assertEqual(Counted.inits, 4)
+        self.assertValid(child1, Counted)
+
+
+if __name__ == '__main__':
+    unittest.main()
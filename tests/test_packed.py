@@ -0,0 +1,120 @@
+"""
+Smoke tests for pygene3.packed
+"""
+
+import unittest
+
+from pygene3.packed import (BitOrganism, MendelBitOrganism, ByteOrganism,
+                            randomMask, byteMask)
+
+
+class Bits(BitOrganism):
+    numbits = 200
+    mutProb = 0.05
+
+    def fitness(self):
+        return self.count()
+
+
+class MendelBits(MendelBitOrganism):
+    numbits = 200
+    dominance = 'and'
+
+    def fitness(self):
+        return len(self.indexes())
+
+
+class Bytes(ByteOrganism):
+    length = 100
+    randMin = 'a'
+    randMax = 'z'
+    mutProb = 0.2
+    mutAmt = 30
+
+    def fitness(self):
+        return sum(self.buffer())
+
+
+class BitOrganismTest(unittest.TestCase):
+
+    def test_random_mask(self):
+        self.assertEqual(randomMask(100, 0.0), 0)
+        self.assertEqual(randomMask(100, 1.0), 2 ** 100 - 1)
+        self.assertLess(randomMask(100, 0.3), 2 ** 100)
+
+    def test_mate_splits_parents_bits(self):
+        a, b = Bits(), Bits()
+        child1, child2 = a + b
+        # each locus of the children holds the bits of the parents
+        self.assertEqual(child1.bits ^ child2.bits, a.bits ^ b.bits)
+        self.assertEqual(child1.bits & child2.bits, a.bits & b.bits)
+
+    def test_mutate(self):
+        org = Bits()
+        mutant = org.mutate()
+        self.assertLess(mutant.bits, 2 ** Bits.numbits)
+        self.assertEqual(org.copy().bits, org.bits)
+        self.assertEqual(Bits.from_genotype_key(org.genotype_key()).bits,
+                         org.bits)
+
+    def test_mutate_empty_genome(self):
+        for species in (Bits, MendelBits):
+            empty = type('Empty', (species,), {'numbits': 0})
+            for oneOnly in (False, True):
+                empty.mutateOneOnly = oneOnly
+                mutant = empty().mutate()
+                self.assertEqual(mutant.genotype_key(),
+                                 empty().genotype_key())
+
+    def test_indexes(self):
+        org = Bits(0b100101)
+        self.assertEqual(org.indexes(), [0, 2, 5])
+        self.assertEqual(org.count(), 3)
+        self.assertEqual([org[i] for i in range(4)], [1, 0, 1, 0])
+
+    def test_mendel(self):
+        a, b = MendelBits(), MendelBits()
+        self.assertEqual(a.phenotype(), a.bits1 & a.bits2)
+        child1, child2 = a + b
+        # the first strands of the children come from this organism
+        self.assertEqual(child1.bits1 ^ child2.bits1, a.bits1 ^ a.bits2)
+        self.assertEqual(child1.bits2 ^ child2.bits2, b.bits1 ^ b.bits2)
+
+
+class ByteOrganismTest(unittest.TestCase):
+
+    def test_byte_mask(self):
+        self.assertEqual(byteMask(10, 0.0), 0)
+        self.assertEqual(byteMask(10, 1.0), 2 ** 80 - 1)
+        data = byteMask(1000, 0.25).to_bytes(1000, 'little')
+        self.assertEqual(set(data) - set([0, 0xff]), set())
+
+    def test_random_data_in_range(self):
+        org = Bytes()
+        self.assertEqual(len(org), 100)
+        self.assertTrue(all(ord('a') <= b <= ord('z') for b in org.data))
+
+    def test_mate_splits_parents_bytes(self):
+        a, b = Bytes(), Bytes()
+        child1, child2 = a + b
+        for x, y, c1, c2 in zip(a.data, b.data, child1.data, child2.data):
+            self.assertEqual(sorted([x, y]), sorted([c1, c2]))
+
+    def test_mutate_empty_sequence(self):
+        empty = type('Empty', (Bytes,), {'length': 0})
+        for oneOnly in (False, True):
+            empty.mutateOneOnly = oneOnly
+            self.assertEqual(empty().mutate().data, b'')
+
+    def test_mutate_stays_in_range(self):
+        org = Bytes()
+        for i in range(20):
+            org = org.mutate()
+            self.assertEqual(len(org), 100)
+            self.assertTrue(all(ord('a') <= b <= ord('z') for b in org.data))
+        self.assertEqual(Bytes.from_genotype_key(org.genotype_key()).text(),
+                         org.text())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Smoke tests for pygene3.population
+"""
+
+import asyncio
+import unittest
+
+from pygene3.gene import FloatGene
+from pygene3.organism import Organism
+from pygene3.population import Population
+from pygene3.evaluator import ThreadEvaluator
+
+
+class Gene(FloatGene):
+    randMin = -10.0
+    randMax = 10.0
+    mutAmt = 1.0
+    mutProb = 0.5
+
+
+class Square(Organism):
+    genome = {'x': Gene, 'y': Gene}
+
+    def fitness(self):
+        return self['x'] ** 2 + self['y'] ** 2
+
+
+class SquarePopulation(Population):
+    species = Square
+    initPopulation = 10
+    childCount = 20
+    childCull = 10
+
+
+class AsyncSquare(Square):
+    running = 0
+    peak = 0
+    prepared = 0
+
+    def prepare_fitness(self):
+        AsyncSquare.prepared += 1
+
+    async def fitness(self):
+        AsyncSquare.running += 1
+        AsyncSquare.peak = max(AsyncSquare.peak, AsyncSquare.running)
+        await asyncio.sleep(0)
+        AsyncSquare.running -= 1
+        return self['x'] ** 2 + self['y'] ** 2
+
+
+class AsyncSquarePopulation(SquarePopulation):
+    species = AsyncSquare
+    asyncConcurrency = 3
+
+
+class PopulationTest(unittest.TestCase):
+
+    def test_step_keeps_population_sorted(self):
+        pop = SquarePopulation()
+        size = len(pop)
+        for i in range(20):
+            best = pop.best().get_fitness()
+            pop.step(3)
+            fitnesses = [org.fitness_cache for org in pop.organisms]
+            self.assertEqual(len(fitnesses), size)
+            self.assertEqual(fitnesses, sorted(fitnesses))
+            self.assertLessEqual(fitnesses[0], best)
+
+    def test_diversity(self):
+        pop = SquarePopulation()
+        self.assertEqual(pop.diversity(), 1.0)
+        pop.organisms = [pop.organisms[0]] * 4
+        self.assertEqual(pop.diversity(), 0.25)
+        self.assertEqual(SquarePopulation(init=0).diversity(), 0.0)
+
+    def test_agen(self):
+        pop = AsyncSquarePopulation()
+
+        async def evolve():
+            for i in range(3):
+                await pop.agen()
+            await pop.asort()
+
+        AsyncSquare.peak = 0
+        asyncio.run(evolve())
+        fitnesses = [org.fitness_cache for org in pop.organisms]
+        self.assertEqual(fitnesses, sorted(fitnesses))
+        self.assertEqual(AsyncSquare.peak, 3)
+
+    def test_agen_mixed_with_sort(self):
+        pop = AsyncSquarePopulation()
+
+        # synchronous evaluation of an async fitness is an error,
+        # and leaves no coroutine behind
+        self.assertRaises(TypeError, pop.sort)
+        self.assertRaises(TypeError, pop.organisms[0].get_fitness)
+        for org in pop.organisms:
+            self.assertIsNone(org.fitness_cache)
+
+        AsyncSquare.prepared = 0
+        asyncio.run(pop.agen())
+        self.assertGreater(AsyncSquare.prepared, 0)
+
+        # the population is sorted by agen(), so sort() has
+        # nothing to calculate
+        pop.sort()
+        fitnesses = [org.fitness_cache for org in pop.organisms]
+        self.assertTrue(all(isinstance(f, float) for f in fitnesses))
+        self.assertEqual(fitnesses, sorted(fitnesses))
+        self.assertEqual(pop.best().fitness_cache, fitnesses[0])
+
+    def test_agen_sync_species_uses_evaluator(self):
+        pop = SquarePopulation(evaluator=ThreadEvaluator(workers=2))
+        with pop.evaluator:
+            asyncio.run(pop.agen())
+            pop.sort()
+        for org in pop.organisms:
+            self.assertEqual(org.fitness_cache, org.fitness())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Smoke tests for pygene3.prog
+"""
+
+import random
+import unittest
+
+from pygene3.prog import (ProgOrganism, ConstNode, VarNode, FuncNode,
+                          typed, vectorSafeDiv)
+
+
+def add(x, y):
+    return x + y
+
+
+def div(x, y):
+    try:
+        return x / y
+    except ZeroDivisionError:
+        return x
+
+
+class Prog(ProgOrganism):
+    funcs = {'+': add}
+    vars = ['x']
+    consts = [0.0, 1.0]
+    initDepth = 4
+
+    def fitness(self):
+        return 0.0
+
+
+class InternTest(unittest.TestCase):
+
+    def intern(self, value):
+        return Prog.intern(ConstNode(Prog(), value))
+
+    def test_equal_constants_shared(self):
+        self.assertIs(self.intern(1.0), self.intern(1.0))
+        self.assertIsNot(self.intern(1), self.intern(1.0))
+
+    def test_signed_zeros_distinct(self):
+        self.assertIsNot(self.intern(0.0), self.intern(-0.0))
+        self.assertEqual(repr(self.intern(-0.0).value), '-0.0')
+
+    def test_nan_shared(self):
+        self.assertIs(self.intern(float('nan')), self.intern(float('nan')))
+
+    def test_genotype_key_round_trip(self):
+        org = Prog()
+        key = org.genotype_key()
+        self.assertIs(Prog.from_genotype_key(key).tree, org.tree)
+
+
+class DivProg(ProgOrganism):
+    funcs = {'+': add, '/': div}
+    vecfuncs = {'/': vectorSafeDiv}
+    vars = ['x', 'y']
+    consts = [0.0, 1.0]
+    initDepth = 5
+
+    def fitness(self):
+        return 0.0
+
+
+class CalcVectorTest(unittest.TestCase):
+
+    def test_matches_scalar_calc(self):
+        xs = [0.0, 1.0, -2.5, 3.0]
+        ys = [0.0, 0.0, 2.0, -1.5]
+        for i in range(50):
+            org = DivProg()
+            self.assertEqual(
+                org.calcVector(x=xs, y=ys),
+                [org.calc(x=x, y=y) for x, y in zip(xs, ys)])
+
+    def test_vector_safe_div(self):
+        self.assertEqual(vectorSafeDiv([1.0, 4.0], [0.0, 2.0]), [1.0, 2.0])
+
+
+class CompiledCacheTest(unittest.TestCase):
+
+    def assertCompiledMatches(self, org):
+        for x, y in [(0.0, 1.0), (2.0, -3.0), (0.5, 0.0)]:
+            self.assertEqual(org.calc(x=x, y=y), org.tree.calc(x=x, y=y))
+            self.assertEqual(org.calcVector(x=[x], y=[y]),
+                             [org.tree.calc(x=x, y=y)])
+
+    def test_compiled_once(self):
+        org = DivProg()
+        self.assertIs(org.compiled(), org.compiled())
+
+    def test_rebuilt_after_mutate_and_mate(self):
+        random.seed(2)
+        orgs = [DivProg() for i in range(10)]
+        for org in orgs:
+            org.calc(x=1.0, y=1.0)
+            org.calcVector(x=[1.0], y=[1.0])
+        for i in range(30):
+            org = orgs[i % 10]
+            mutant = org.mutate()
+            self.assertCompiledMatches(mutant)
+            for child in org + orgs[(i + 1) % 10]:
+                self.assertCompiledMatches(child)
+            orgs[i % 10] = mutant
+
+    def test_dropped_when_tree_replaced(self):
+        org = DivProg()
+        compiled = org.compiled()
+        org.tree = DivProg().tree
+        self.assertIsNot(org.compiled(), compiled)
+        self.assertCompiledMatches(org)
+
+
+@typed(float, float, float)
+def tadd(x, y):
+    return x + y
+
+
+@typed(bool, float, float)
+def greater(x, y):
+    return x > y
+
+
+class TypedProg(ProgOrganism):
+    funcs = {'+': tadd, '>': greater}
+    vars = [('x', float)]
+    consts = [1.0, True]
+    type = float
+    debugTypes = True
+    initDepth = 4
+
+    def fitness(self):
+        return 0.0
+
+
+class TypeCheckTest(unittest.TestCase):
+
+    def test_ill_typed_tree_rejected_at_intern(self):
+        org = TypedProg()
+        node = FuncNode(org, 1, '+', [ConstNode(org, True),
+                                      ConstNode(org, 1.0)])
+        self.assertRaises(TypeError, TypedProg.intern, node)
+        self.assertRaises(TypeError, TypedProg, node)
+
+    def test_root_of_wrong_type_rejected(self):
+        org = TypedProg()
+        node = FuncNode(org, 1, '>', [VarNode(org, 'x'),
+                                      ConstNode(org, 1.0)])
+        self.assertRaises(TypeError, TypedProg, node)
+
+    def test_well_typed_tree_accepted(self):
+        org = TypedProg()
+        node = FuncNode(org, 1, '+', [VarNode(org, 'x'),
+                                      ConstNode(org, 1.0)])
+        self.assertEqual(TypedProg(node).calc(x=2.0), 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Smoke tests for pygene3.schema
+"""
+
+import unittest
+
+from pygene3.gene import FloatGene
+from pygene3.organism import Organism
+
+
+class Plain(FloatGene):
+    randMin = 0.0
+    randMax = 1.0
+    mutProb = 0.0
+
+
+class OldHook(Plain):
+    mutProb = 1.0
+
+    def maybeMutate(self):
+        self.value = -1.0
+
+
+class Species(Organism):
+    genome = {'a': Plain, 'b': OldHook}
+
+    def fitness(self):
+        return 0.0
+
+
+class SchemaTest(unittest.TestCase):
+
+    def tearDown(self):
+        Plain.mutProb = 0.0
+
+    def test_maybe_mutate_override_is_called(self):
+        schema = Species.schema()
+        self.assertEqual(schema.customMutation, (1,))
+        org = Species()
+        mutant = org.mutate()
+        self.assertEqual(mutant.genes['b'].value, -1.0)
+        self.assertNotEqual(org.genes['b'].value, -1.0)
+
+    def test_mutprob_read_at_mutation_time(self):
+        org = Species()
+        self.assertIs(org.mutate().genes['a'], org.genes['a'])
+        Plain.mutProb = 1.0
+        self.assertIsNot(org.mutate().genes['a'], org.genes['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Smoke tests for pygene3.selection
+"""
+
+import unittest
+
+from pygene3.selection import (SqrtSelection, RankSelection,
+                               RouletteSelection, TournamentSelection)
+
+
+class Fit(object):
+    """
+    Stand-in organism with a computed fitness
+    """
+    def __init__(self, fitness):
+        self.fitness_cache = fitness
+
+
+class SelectionTest(unittest.TestCase):
+
+    def assertDistinctPairs(self, pairs, count):
+        for first, second in pairs:
+            self.assertNotEqual(first, second)
+            self.assertTrue(0 <= first < count)
+            self.assertTrue(0 <= second < count)
+
+    def test_pairs_distinct(self):
+        organisms = [Fit(f) for f in range(10)]
+        for selection in (SqrtSelection(), RankSelection(),
+                          RouletteSelection(), TournamentSelection(3)):
+            pairs = selection.pairs(organisms, 50)
+            self.assertEqual(len(pairs), 50)
+            self.assertDistinctPairs(pairs, 10)
+
+    def test_pairs_degenerate_rank_weights(self):
+        # weights are [2, 0] - only the fittest can ever be drawn
+        pairs = RankSelection(pressure=2.0).pairs([Fit(1), Fit(2)], 3)
+        self.assertEqual(pairs, [(0, 1)] * 3)
+
+    def test_pairs_degenerate_roulette_weights(self):
+        organisms = [Fit(0.0), Fit(float('inf')), Fit(float('inf'))]
+        pairs = RouletteSelection().pairs(organisms, 20)
+        self.assertDistinctPairs(pairs, 3)
+
+    def test_pairs_degenerate_tournament(self):
+        # the fittest of 50 contestants out of 2 is almost always 0
+        pairs = TournamentSelection(size=50).pairs([Fit(1), Fit(2)], 5)
+        self.assertDistinctPairs(pairs, 2)
+
+    def test_single_organism(self):
+        self.assertEqual(SqrtSelection().pairs([Fit(1)], 2), [(0, 0)] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()